@@ -1,23 +1,41 @@
+import json
 import logging
 import os
+import sys
 import time
-from logging import FileHandler
 
-import psycopg2
+import click
 from dotenv import load_dotenv
-from flask import Flask, Response, jsonify, request
+from flask import Flask, Response, abort, jsonify, make_response, request
 from flask_bcrypt import Bcrypt
 from flask_migrate import Migrate
 from pythonjsonlogger import jsonlogger
-from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy_utils import create_database, database_exists
-from statsd import StatsClient
 
 from assignments import assignments_bp
-from extensions import auth
+from auth_tokens import token_signer, tokens_bp
+from bcrypt_pool import BcryptPoolSaturated
+from db_config import engine_options, register_pool_metrics
+from extensions import (
+    basic_auth,
+    bcrypt_pool,
+    credential_cache,
+    queued_logging,
+    request_metrics,
+    request_profiler,
+    sns_publisher,
+    statsd,
+    traffic_recorder,
+)
+from health import health_probe
+from log_queue import BatchingFileHandler
 from models import Account, db
+from outbox import delete_delivered, drain_outbox
 from populate_db import populate_db
+from profiling import summarize
+from sns_publisher import StubSns
+from traffic import make_sender, read_capture, replay
 
 # Load environment variables
 if os.path.exists("/opt/webapp.properties"):
@@ -27,18 +45,24 @@ else:
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-if not database_exists(engine.url):
-    create_database(engine.url)
+# checked with a throwaway connection, the app shares one pooled engine
+if not database_exists(DATABASE_URL):
+    create_database(DATABASE_URL)
     print("Database created:")
 
 # Flask app setup
 app = Flask(__name__)
 app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options()
+app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
 app.register_blueprint(assignments_bp)
+app.register_blueprint(tokens_bp)
 
-# Initialize Logging
-file_handler = FileHandler("/var/log/webapp/csye6225.log")
+# Initialize Logging, lines are written in batches by a background thread
+file_handler = BatchingFileHandler(
+    os.getenv("LOG_FILE", "/var/log/webapp/csye6225.log"),
+    capacity=int(os.getenv("LOG_BATCH_SIZE", 100)),
+)
 # file_handler = FileHandler("test.log")
 file_handler.setLevel(logging.INFO)
 
@@ -54,20 +78,43 @@ formatter = UTCJsonFormatter(
 )
 
 file_handler.setFormatter(formatter)
-app.logger.addHandler(file_handler)
+queued_logging.init_app(app, file_handler)
 app.logger.setLevel(logging.INFO)
 
-# Statsd Metrics
-statsd = StatsClient("localhost", 8125)
+# Initialize the statsd pipeline and per-request metrics
+statsd.init_app(app)
+request_metrics.init_app(app)
 
 # Initialize the database
 db.init_app(app)
+with app.app_context():
+    register_pool_metrics(db.engine)
+    request_metrics.watch_engine(db.engine)
 
 # Initialize the Flask_migrate
 migrate = Migrate(app, db)
 
+# Initialize the database health probe
+health_probe.init_app(app)
+
 # Initialize the Bcrypt
 bcrypt = Bcrypt(app)
+bcrypt_pool.init_app(app)
+
+# Initialize the verified credential cache
+credential_cache.init_app(app)
+
+# Initialize the bearer token signer
+token_signer.init_app(app)
+
+# Initialize the background SNS publisher
+sns_publisher.init_app(app, on_delivered=lambda ids: delete_delivered(app, ids))
+
+# Initialize the request profiler
+request_profiler.init_app(app)
+
+# Initialize the traffic recorder
+traffic_recorder.init_app(app)
 
 
 # Database Health check
@@ -88,14 +135,11 @@ def database_health_check():
         app.logger.warning("Health check endpoint called with unexpected data")
         return Response(status=400, headers=headers)
 
-    try:
-        connection = psycopg2.connect(os.getenv("DATABASE_URL"))
-        connection.close()
+    # uses the engine pool, failures are logged by the probe
+    if health_probe.check():
         app.logger.info("Database connection successful for health check")
         response = Response(status=200, headers=headers)
-
-    except Exception as e:
-        app.logger.error(f"Database connection failed for health check: {e}")
+    else:
         response = Response(status=503, headers=headers)
 
     return response
@@ -104,8 +148,12 @@ def database_health_check():
 # add required Headers
 @app.after_request
 def modify_headers(response):
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Pragma"] = "no-cache"
+    if "ETag" in response.headers:
+        # cacheable per user, but must be revalidated with If-None-Match
+        response.headers["Cache-Control"] = "private, no-cache"
+    else:
+        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+        response.headers["Pragma"] = "no-cache"
     response.headers["X-Content-Type-Options"] = "nosniff"
     response.headers["content-type"] = "application/json"
     if response.status_code == 405:
@@ -126,51 +174,144 @@ def create_tables():
 
 # CLI command to populate database from csv
 @app.cli.command("populate_db")
-def populate_db_command():
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=lambda: int(os.getenv("IMPORT_CHUNK_SIZE", 1000)),
+    help="Users inserted and committed per chunk.",
+)
+def populate_db_command(chunk_size):
     csv_path = os.getenv("CSV_PATH", "/opt/users.csv")
     if not csv_path:
         app.logger.error("CSV_PATH environment variable not set!")
         return
     try:
-        populate_db(csv_path, bcrypt)
-        app.logger.info("Database populated successfully.")
+        inserted, skipped = populate_db(csv_path, chunk_size)
+        app.logger.info(
+            f"Database populated successfully: {inserted} added, {skipped} skipped."
+        )
+    except FileNotFoundError:
+        app.logger.error(f"File {csv_path} not found!")
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"An error occurred while populating the database: {e}")
 
 
+# CLI command to publish notifications left in the outbox
+@app.cli.command("drain_outbox")
+@click.option("--batch-size", default=100, help="Rows claimed per transaction.")
+@click.option("--loop", is_flag=True, help="Keep draining until stopped.")
+@click.option("--interval", default=5.0, help="Seconds between passes with --loop.")
+def drain_outbox_command(batch_size, loop, interval):
+    while True:
+        try:
+            published = drain_outbox(app, batch_size)
+            app.logger.info(f"Outbox drain published {published} notifications.")
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"An error occurred while draining the outbox: {e}")
+        if not loop:
+            return
+        time.sleep(interval)
+
+
+# CLI command to show the hottest functions across captured profiles
+@app.cli.command("profile_summary")
+@click.option("--limit", default=20, help="Number of functions to show.")
+@click.option("--sort", default="cumulative", help="pstats sort key, e.g. tottime.")
+@click.option("--endpoint", default=None, help="Only profiles of this endpoint.")
+def profile_summary_command(limit, sort, endpoint):
+    paths = request_profiler.profiles()
+    if endpoint:
+        paths = [path for path in paths if f"-{endpoint}-" in os.path.basename(path)]
+    if not paths:
+        click.echo(f"No profiles found in {request_profiler.directory}")
+        return
+    click.echo(f"Summary of {len(paths)} profiles")
+    click.echo(summarize(paths, limit, sort))
+
+
+# CLI command to replay a traffic capture and compare latencies
+@app.cli.command("replay_traffic")
+@click.argument("capture", type=click.Path(exists=True, dir_okay=False))
+@click.option("--speed", default=1.0, help="Speed up factor, 0 sends back to back.")
+@click.option("--concurrency", default=8, help="Requests in flight at once.")
+@click.option("--url", default=None, help="Replay against a running server.")
+@click.option("--email", default=None, help="Account used for authenticated requests.")
+@click.option("--password", default=None, help="Password of that account.")
+def replay_traffic_command(capture, speed, concurrency, url, email, password):
+    if not url:
+        # replayed submissions are published to a stub, not to SNS
+        sns_publisher.client = StubSns()
+    send = make_sender(app, url and url.rstrip("/"), email, password)
+    report = replay(read_capture(capture), send, speed, concurrency)
+    if not url:
+        sns_publisher.flush(timeout=10)
+    click.echo(json.dumps(report, indent=2))
+
+
+# CLI command to run the app under gunicorn with multiple workers
+@app.cli.command("serve")
+def serve_command():
+    root = os.path.dirname(os.path.abspath(__file__))
+    config = os.path.join(root, "gunicorn.conf.py")
+    # replace this process so systemd signals (HUP to reload) reach gunicorn
+    os.execv(
+        sys.executable,
+        [sys.executable, "-m", "gunicorn", "-c", config, "--chdir", root, "wsgi:app"],
+    )
+
+
 # with app.app_context():
-#     populate_db("users.csv", bcrypt)
+#     populate_db("users.csv")
 
 
 def check_password(hashed_pw, password):
-    return bcrypt.check_password_hash(hashed_pw, password)
+    return bcrypt_pool.check(hashed_pw, password)
 
 
 # verify base64 encoded username and password with HTTPBasic auth
-@auth.verify_password
+@basic_auth.verify_password
 def verify_password(email, password):
     try:
         if not email or not password:
             return False
+
+        # skip bcrypt if these credentials were verified recently
+        cached = credential_cache.get(email, password)
+        if cached:
+            statsd.incr("csye6225_auth_cache_hit")
+            account_id, password_hash = cached
+            user = db.session.get(Account, account_id)
+            if user and user.email == email and user.password == password_hash:
+                return user
+            credential_cache.invalidate(email)
+        else:
+            statsd.incr("csye6225_auth_cache_miss")
+
         user = Account.query.filter_by(email=email).first()
         if user and check_password(user.password, password):
+            credential_cache.add(email, password, user.id, user.password)
             return user
         app.logger.warning(
             "Authentication failed for user: {email}".format(email=email)
         )
         return False
 
+    # anything but False or None counts as a successful login, so errors
+    # below abort the request or deny it instead of returning a response
+    except BcryptPoolSaturated:
+        app.logger.warning(f"bcrypt queue is full, rejecting login for user {email}")
+        abort(make_response(jsonify({"message": "Server is busy, retry later."}), 503))
+
     except SQLAlchemyError as e:
         app.logger.error(
             f"Database error occurred during authentication for user {email}: {e}"
         )
-        return jsonify({"message": "Database error occurred."}), 503
+        abort(make_response(jsonify({"message": "Database error occurred."}), 503))
 
     except Exception as e:
         app.logger.error(
             f"Unexpected error during authentication for user {email}: {e}"
         )
-        return (
-            jsonify({"message": "Unable to verify user."}),
-            400,
-        )
+        return False
@@ -1,16 +1,22 @@
+import hashlib
 import json
 import os
 from datetime import datetime
 from uuid import UUID
 
-import boto3
 from flask import Blueprint
 from flask import current_app as app
-from flask import jsonify, request
+from flask import Response, jsonify, request, stream_with_context
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import aliased
 
-from extensions import auth
-from models import Account, Assignment, AssignmentSubmission, db
+from extensions import auth, sns_publisher
+from models import Account, Assignment, AssignmentSubmission, SubmissionAttempt, db
+from outbox import add_to_outbox
+from pagination import PAGE_ARGS, decode_cursor, encode_cursor, is_paginated, page_size
+from serializers import assignment_encoder, json_response
 
 # create Blueprint to modularize the code
 assignments_bp = Blueprint("assignments", __name__)
@@ -18,22 +24,147 @@ assignments_bp = Blueprint("assignments", __name__)
 
 version = "wed"
 
+# query params accepted by the assignment listing
+LIST_ARGS = PAGE_ARGS | {"stream"}
+
+# query params accepted by the submission listing
+SUBMISSION_ARGS = PAGE_ARGS | {"latest"}
+
+
+def stream_assignments(query):
+    """Yield the listing as JSON chunks, one assignment at a time.
+
+    Rows are read through a server-side cursor so memory stays flat no
+    matter how many assignments are returned.
+    """
+    batch_size = int(os.getenv("STREAM_BATCH_SIZE", 500))
+    yield "["
+    count = 0
+    try:
+        rows = db.session.execute(query.execution_options(yield_per=batch_size))
+        for row in rows:
+            yield ("," if count else "") + assignment_encoder.encode(row)
+            count += 1
+    except SQLAlchemyError as e:
+        # the status line is already sent, so the body is left truncated
+        app.logger.error(f"Database error occurred while streaming assignments: {e}")
+        return
+    app.logger.info(f"Streamed {count} assignments successfully.")
+    # json_response ends the buffered body with a newline, like jsonify
+    yield "]\n"
+
+
+def streamed_response(query):
+    return Response(
+        stream_with_context(stream_assignments(query)),
+        status=200,
+        mimetype="application/json",
+    )
+
+
+def make_etag(*parts):
+    return hashlib.sha1(":".join(map(str, parts)).encode("UTF-8")).hexdigest()
+
+
+def listing_etag():
+    # any insert, update or delete changes the row count or latest update
+    count, last_updated = db.session.query(
+        func.count(Assignment.id), func.max(Assignment.assignment_updated)
+    ).one()
+    return make_etag(count, last_updated)
+
+
+def rows_etag(rows):
+    # the value listing_etag computes in the database, from rows already loaded
+    last_updated = max((row.assignment_updated for row in rows), default=None)
+    return make_etag(len(rows), last_updated)
+
+
+def page_etag(rows, next_cursor):
+    # a page is fully described by its rows and the cursor that follows it
+    return make_etag(next_cursor, *((row.id, row.assignment_updated) for row in rows))
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    return response
+
+
+def not_modified(etag):
+    return with_etag(Response(status=304), etag)
 
 
 # use login_required decorator to verify authentication
 @assignments_bp.route(f"/{version}/assignments", methods=["GET"])
 @auth.login_required
 def get_assignments():
-    # do not accept any payload or query params
-    if request.data or request.form or request.args:
+    # do not accept any payload, only the listing query params
+    if request.data or request.form or set(request.args) - LIST_ARGS:
         app.logger.warning("Bad request: unexpected data received in get_assignments")
         return jsonify({"message": "Bad Request"}), 400
 
+    stream = request.args.get("stream", "false").lower() in ("true", "1")
+
     try:
         # all authenticated users can see assignments
-        assignments = Assignment.query.all()
-        app.logger.info(f"Retrieved {len(assignments)} assignments successfully.")
-        return jsonify([assignment.to_dict() for assignment in assignments]), 200
+        if not is_paginated(request.args):
+            etag = None
+            # answer conditional requests without loading any rows
+            if request.if_none_match:
+                etag = listing_etag()
+                if etag in request.if_none_match:
+                    app.logger.info("Assignments not modified since last request.")
+                    return not_modified(etag)
+            query = assignment_encoder.select()
+            if stream:
+                # headers go out before any row is read, the aggregate is needed
+                return with_etag(streamed_response(query), etag or listing_etag())
+            assignments = db.session.execute(query).all()
+            app.logger.info(f"Retrieved {len(assignments)} assignments successfully.")
+            response = json_response(assignment_encoder.encode_many(assignments))
+            return with_etag(response, rows_etag(assignments)), 200
+
+        try:
+            limit = page_size(request.args)
+            cursor = request.args.get("cursor")
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            app.logger.warning(
+                f"Bad request: invalid pagination in get_assignments: {e}"
+            )
+            return jsonify({"message": "Bad Request"}), 400
+
+        # keyset pagination over (assignment_created, id)
+        query = assignment_encoder.select().order_by(
+            Assignment.assignment_created, Assignment.id
+        )
+        if after:
+            query = query.where(
+                tuple_(Assignment.assignment_created, Assignment.id) > tuple_(*after)
+            )
+        # pages are bounded by PAGE_SIZE_MAX, so they are always buffered and
+        # their ETag comes from their own rows instead of the whole table
+        assignments = db.session.execute(query.limit(limit + 1)).all()
+
+        next_cursor = None
+        if len(assignments) > limit:
+            assignments = assignments[:limit]
+            last = assignments[-1]
+            next_cursor = encode_cursor(last.assignment_created, last.id)
+
+        etag = page_etag(assignments, next_cursor)
+        if etag in request.if_none_match:
+            app.logger.info("Assignment page not modified since last request.")
+            return not_modified(etag)
+
+        app.logger.info(
+            f"Retrieved page of {len(assignments)} assignments successfully."
+        )
+        response = json_response(
+            '{"assignments":%s,"next":%s}'
+            % (assignment_encoder.encode_many(assignments), json.dumps(next_cursor))
+        )
+        return with_etag(response, etag), 200
 
     except SQLAlchemyError as e:
         app.logger.error(f"Database error occurred: {e}")
@@ -47,6 +178,31 @@ def get_assignments():
         )
 
 
+# Basic auth loads the Account, a bearer token is verified without the
+# database and its account may have been deleted since it was issued
+def current_account():
+    user = auth.current_user()
+    if isinstance(user, Account):
+        return user
+    return db.session.get(Account, user.id)
+
+
+def user_not_found():
+    app.logger.error(f"User not found for email: {auth.current_user().email}")
+    return jsonify({"message": "User not found."}), 403
+
+
+# add code level checks before database constraints, returns an error message
+def validate_assignment(data):
+    if not (1 <= data.get("points", 0) <= 100):
+        return "Assignment points must be between 1 and 100."
+
+    if not (1 <= data.get("num_of_attempts", 0) <= 10):
+        return "Number of attempts must be between 1 and 10."
+
+    return None
+
+
 def create_or_update_assignment(data, user, assignment=None):
     if not assignment:
         assignment = Assignment()
@@ -66,28 +222,16 @@ def create_assignment():
     try:
         data = request.get_json()
 
-        # add code level checks before database constraints
-        if not (1 <= data.get("points", 0) <= 100):
-            app.logger.warning("Assignment points out of range.")
-            return (
-                jsonify({"message": "Assignment points must be between 1 and 100."}),
-                400,
-            )
-
-        if not (1 <= data.get("num_of_attempts", 0) <= 10):
-            app.logger.warning("Number of attempts out of range.")
-            return (
-                jsonify({"message": "Number of attempts must be between 1 and 10."}),
-                400,
-            )
-
-        # get the logged in user info
-        user_email = auth.current_user().email
-        user = Account.query.filter_by(email=user_email).first()
+        error = validate_assignment(data)
+        if error:
+            app.logger.warning(f"Invalid assignment data: {error}")
+            return jsonify({"message": error}), 400
 
+        # reuse the identity loaded during authentication for this request
+        user = current_account()
         if not user:
-            app.logger.error(f"User not found for email: {user_email}")
-            return jsonify({"message": "User not found."}), 403
+            return user_not_found()
+        user_email = user.email
 
         assignment = create_or_update_assignment(data, user)
         db.session.add(assignment)
@@ -110,6 +254,115 @@ def create_assignment():
         )
 
 
+def validate_batch_item(item):
+    if not isinstance(item, dict):
+        return "Each assignment must be a JSON object."
+
+    if not item.get("name") or not item.get("deadline"):
+        return "Assignment name and deadline are required."
+
+    if not isinstance(item["name"], str):
+        return "Assignment name must be a string."
+
+    # bool is an int subclass, but true is not a valid number of points
+    for field in ("points", "num_of_attempts"):
+        value = item.get(field)
+        if not isinstance(value, int) or isinstance(value, bool):
+            return f"Assignment {field} must be an integer."
+
+    try:
+        item["deadline"] = datetime.fromisoformat(item["deadline"])
+    except (TypeError, ValueError):
+        return "Assignment deadline must be an ISO 8601 date."
+
+    if "id" in item and not is_valid_uuid(item["id"]):
+        return "Invalid assignment ID"
+
+    return validate_assignment(item)
+
+
+@assignments_bp.route(f"/{version}/assignments/batch", methods=["POST"])
+@auth.login_required
+def batch_assignments():
+    """Create or update many assignments in one transaction.
+
+    Items with an id update that assignment, the rest are created. Invalid
+    items are reported and skipped, the valid ones are written together.
+    """
+    try:
+        data = request.get_json()
+        batch_max = int(os.getenv("ASSIGNMENT_BATCH_MAX", 500))
+        if not isinstance(data, list) or not 1 <= len(data) <= batch_max:
+            app.logger.warning("Invalid assignment batch received.")
+            return (
+                jsonify(
+                    {"message": f"Expected a list of 1 to {batch_max} assignments."}
+                ),
+                400,
+            )
+
+        user = current_account()
+        if not user:
+            return user_not_found()
+        results = [None] * len(data)
+        valid = []
+        for index, item in enumerate(data):
+            error = validate_batch_item(item)
+            if error:
+                results[index] = {"status": 400, "message": error}
+            else:
+                valid.append((index, item))
+
+        # load every assignment being updated with one query
+        update_ids = [UUID(str(item["id"])) for _, item in valid if "id" in item]
+        existing = {}
+        if update_ids:
+            existing = {
+                assignment.id: assignment
+                for assignment in Assignment.query.filter(Assignment.id.in_(update_ids))
+            }
+
+        written = []
+        for index, item in valid:
+            if "id" not in item:
+                assignment = create_or_update_assignment(item, user)
+                db.session.add(assignment)
+                written.append((index, assignment, 201))
+                continue
+
+            assignment = existing.get(UUID(str(item["id"])))
+            if not assignment:
+                results[index] = {"status": 404, "message": "Assignment not found"}
+            elif assignment.account_id != user.id:
+                results[index] = {"status": 403, "message": "Permission denied"}
+            else:
+                create_or_update_assignment(item, user, assignment)
+                written.append((index, assignment, 200))
+
+        # new assignments go out as a single multi-row insert
+        db.session.flush()
+        for index, assignment, status in written:
+            results[index] = {"status": status, "assignment": assignment.to_dict()}
+        db.session.commit()
+        app.logger.info(
+            f"Assignment batch of {len(data)} processed by user {user.email}, "
+            f"{len(written)} written"
+        )
+
+        return jsonify({"results": results}), 200
+
+    except SQLAlchemyError as e:
+        app.logger.error(f"Database error occurred while processing batch: {e}")
+        return jsonify({"message": "Database error occurred."}), 503
+
+    except Exception as e:
+        app.logger.error(f"Unexpected error while processing assignment batch: {e}")
+        return (
+            jsonify({"message": "Unable to process assignments."}),
+            400,
+        )
+
+
 # check if the id is UUID
 def is_valid_uuid(val):
     try:
@@ -134,13 +387,23 @@ def get_assignment_detail(assignment_id):
             )
             return jsonify({"message": "Invalid assignment ID"}), 400
 
-        # retrieve the assignment using assignment_id sent in the request
-        assignment = Assignment.query.get(assignment_id)
+        # retrieve only the columns the response needs, no ORM hydration
+        assignment = db.session.execute(
+            assignment_encoder.select().where(Assignment.id == UUID(assignment_id))
+        ).first()
         if not assignment:
             app.logger.warning("Assignment not found for ID: {}".format(assignment_id))
             return jsonify({"message": "Assignment not found"}), 404
+
+        # skip serialization when the client already has this version
+        etag = make_etag(assignment.id, assignment.assignment_updated.isoformat())
+        if etag in request.if_none_match:
+            app.logger.info("Assignment {} not modified".format(assignment_id))
+            return not_modified(etag)
+
         app.logger.info("Assignment detail retrieved for ID: {}".format(assignment_id))
-        return jsonify(assignment.to_dict()), 200
+        response = json_response(assignment_encoder.encode(assignment))
+        return with_etag(response, etag), 200
 
     except SQLAlchemyError as e:
         app.logger.error(
@@ -161,13 +424,11 @@ def delete_assignment(assignment_id):
             app.logger.warning(f"Invalid assignment ID received: {assignment_id}")
             return jsonify({"message": "Invalid assignment ID"}), 400
 
-        # get the logged in user info
-        user_email = auth.current_user().email
-        user = Account.query.filter_by(email=user_email).first()
-
+        # reuse the identity loaded during authentication for this request
+        user = current_account()
         if not user:
-            app.logger.error(f"User not found for email: {user_email}")
-            return jsonify({"message": "User not found."}), 403
+            return user_not_found()
+        user_email = user.email
 
         # retrieve the assignment using assignment_id sent in the request
         assignment = Assignment.query.get(assignment_id)
@@ -183,6 +444,7 @@ def delete_assignment(assignment_id):
             return jsonify({"message": "Permission denied"}), 403
 
         AssignmentSubmission.query.filter_by(assignment_id=assignment_id).delete()
+        SubmissionAttempt.query.filter_by(assignment_id=assignment_id).delete()
         db.session.delete(assignment)
         db.session.commit()
         app.logger.info(
@@ -210,34 +472,16 @@ def update_assignment(assignment_id):
     try:
         data = request.get_json()
 
-        # add code level checks before database constraints
-        if not (1 <= data.get("points", 0) <= 100):
-            app.logger.warning(
-                f"Assignment points out of range for assignment {assignment_id}"
-            )
-            return (
-                jsonify({"message": "Assignment points must be between 1 and 100."}),
-                400,
-            )
-
-        if not (1 <= data.get("num_of_attempts", 0) <= 10):
-            app.logger.warning(
-                f"Number of attempts out of range for assignment {assignment_id}"
-            )
-            return (
-                jsonify({"message": "Number of attempts must be between 1 and 10."}),
-                400,
-            )
-
-        # get the logged in user info
-        user_email = auth.current_user().email
-        user = Account.query.filter_by(email=user_email).first()
+        error = validate_assignment(data)
+        if error:
+            app.logger.warning(f"Invalid data for assignment {assignment_id}: {error}")
+            return jsonify({"message": error}), 400
 
+        # reuse the identity loaded during authentication for this request
+        user = current_account()
         if not user:
-            app.logger.error(
-                f"User not found for email: {user_email} during assignment update"
-            )
-            return jsonify({"message": "User not found."}), 403
+            return user_not_found()
+        user_email = user.email
 
         # retrieve the assignment using assignment_id sent in the request
         assignment = Assignment.query.get(assignment_id)
@@ -276,37 +520,169 @@ def update_assignment(assignment_id):
         )
 
 
-def post_to_sns(
+def build_submission_message(
     submission_url,
     user_email,
     user_first_name,
     user_last_name,
-    topic_arn,
     assignment_id,
     submission_count,
     total_attempts,
     assignment_name,
 ):
+    return {
+        "submission_url": submission_url,
+        "user_email": user_email,
+        "user_first_name": user_first_name,
+        "user_last_name": user_last_name,
+        "assignment_id": assignment_id,
+        "submission_count": submission_count,
+        "total_attempts": total_attempts,
+        "assignment_name": assignment_name,
+    }
+
+
+def claim_attempt(assignment_id, user_id):
+    """Use up one submission attempt, in a single round-trip.
+
+    Inserts or increments the attempt counter only while the deadline has
+    not passed and attempts remain. Postgres re-checks the guard against the
+    locked counter row, so concurrent submissions cannot exceed the limit.
+    Returns (attempts, num_of_attempts, name) or None if nothing was claimed.
+    """
+    max_attempts = (
+        select(Assignment.num_of_attempts)
+        .where(Assignment.id == assignment_id)
+        .scalar_subquery()
+    )
+    name = (
+        select(Assignment.name).where(Assignment.id == assignment_id).scalar_subquery()
+    )
+    open_assignment = select(
+        Assignment.id, literal(user_id, SubmissionAttempt.account_id.type), literal(1)
+    ).where(Assignment.id == assignment_id, Assignment.deadline >= datetime.utcnow())
+    statement = (
+        insert(SubmissionAttempt)
+        .from_select(["assignment_id", "account_id", "attempts"], open_assignment)
+        .on_conflict_do_update(
+            index_elements=["assignment_id", "account_id"],
+            set_={"attempts": SubmissionAttempt.attempts + 1},
+            where=SubmissionAttempt.attempts < max_attempts,
+        )
+        .returning(
+            SubmissionAttempt.attempts,
+            max_attempts.label("num_of_attempts"),
+            name.label("name"),
+        )
+    )
+    return db.session.execute(statement).first()
+
+
+def submissions_query(assignment_id, latest=False):
+    """Select an assignment's submissions, optionally only each student's last."""
+    if not latest:
+        return AssignmentSubmission, select(AssignmentSubmission).where(
+            AssignmentSubmission.assignment_id == assignment_id
+        )
+
+    # DISTINCT ON keeps the first row per account in this ordering
+    last_attempts = (
+        select(AssignmentSubmission)
+        .where(AssignmentSubmission.assignment_id == assignment_id)
+        .distinct(AssignmentSubmission.account_id)
+        .order_by(
+            AssignmentSubmission.account_id,
+            AssignmentSubmission.submission_date.desc(),
+            AssignmentSubmission.id.desc(),
+        )
+        .subquery()
+    )
+    submission = aliased(AssignmentSubmission, last_attempts)
+    return submission, select(submission)
+
+
+@assignments_bp.route(
+    f"/{version}/assignments/<assignment_id>/submissions", methods=["GET"]
+)
+@auth.login_required
+def get_submissions(assignment_id):
+    # do not accept any payload, only the listing query params
+    if request.data or request.form or set(request.args) - SUBMISSION_ARGS:
+        app.logger.warning("Bad request: unexpected data received in get_submissions")
+        return jsonify({"message": "Bad Request"}), 400
+
+    if not is_valid_uuid(assignment_id):
+        app.logger.warning(f"Invalid assignment ID received: {assignment_id}")
+        return jsonify({"message": "Invalid assignment ID"}), 400
+
+    latest = request.args.get("latest", "false").lower() in ("true", "1")
+
     try:
-        sns_client = boto3.client("sns", region_name=os.getenv("AWS_REGION"))
-        message = {
-            "submission_url": submission_url,
-            "user_email": user_email,
-            "user_first_name": user_first_name,
-            "user_last_name": user_last_name,
-            "assignment_id": assignment_id,
-            "submission_count": submission_count,
-            "total_attempts": total_attempts,
-            "assignment_name": assignment_name,
-        }
-        response = sns_client.publish(TopicArn=topic_arn, Message=json.dumps(message))
+        try:
+            limit = page_size(request.args)
+            cursor = request.args.get("cursor")
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            app.logger.warning(
+                f"Bad request: invalid pagination in get_submissions: {e}"
+            )
+            return jsonify({"message": "Bad Request"}), 400
+
+        user = current_account()
+        if not user:
+            return user_not_found()
+        owner_id = db.session.execute(
+            select(Assignment.account_id).where(Assignment.id == UUID(assignment_id))
+        ).scalar()
+        if not owner_id:
+            app.logger.warning(f"Assignment {assignment_id} not found")
+            return jsonify({"message": "Assignment not found"}), 404
+
+        # only the owner of the assignment can read its submissions
+        if owner_id != user.id:
+            app.logger.warning(
+                f"User {user.email} attempted to list submissions without permission"
+            )
+            return jsonify({"message": "Permission denied"}), 403
+
+        # keyset pagination over (submission_date, id)
+        submission, query = submissions_query(UUID(assignment_id), latest)
+        query = query.order_by(submission.submission_date, submission.id)
+        if after:
+            query = query.where(
+                tuple_(submission.submission_date, submission.id) > tuple_(*after)
+            )
+        submissions = db.session.scalars(query.limit(limit + 1)).all()
+
+        next_cursor = None
+        if len(submissions) > limit:
+            submissions = submissions[:limit]
+            last = submissions[-1]
+            next_cursor = encode_cursor(last.submission_date, last.id)
+
         app.logger.info(
-            f"Successfully published to SNS topic {topic_arn} with message: {message}"
+            f"Retrieved page of {len(submissions)} submissions for assignment "
+            f"{assignment_id}"
+        )
+        return (
+            jsonify(
+                {
+                    "submissions": [s.to_dict() for s in submissions],
+                    "next": next_cursor,
+                }
+            ),
+            200,
+        )
+
+    except SQLAlchemyError as e:
+        app.logger.error(
+            f"Database error occurred while listing submissions for {assignment_id}: {e}"
         )
-        return response
+        return jsonify({"message": "Database error occurred."}), 503
+
     except Exception as e:
-        app.logger.error(f"Error publishing to SNS topic {topic_arn}: {e}")
-        raise e
+        app.logger.error(f"Unexpected error in get_submissions: {e}")
+        return jsonify({"message": "Unable to fetch submissions."}), 400
 
 
 @assignments_bp.route(
@@ -318,23 +694,30 @@ def submit_assignment(assignment_id):
         data = request.get_json()
         submission_url = data.get("submission_url")
 
-        assignment = Assignment.query.get(assignment_id)
-        if not assignment:
-            app.logger.warning(f"Assignment {assignment_id} not found")
-            return jsonify({"message": "Assignment not found"}), 404
-
-        # check the deadline
-        if datetime.utcnow() > assignment.deadline:
-            app.logger.warning(f"Assignment {assignment_id} submission deadline passed")
-            return jsonify({"message": "Submission deadline has passed."}), 403
+        if not is_valid_uuid(assignment_id):
+            app.logger.warning(f"Invalid assignment ID received: {assignment_id}")
+            return jsonify({"message": "Invalid assignment ID"}), 400
 
-        # check number of attempts
-        user_id = auth.current_user().id
-        submission_count = AssignmentSubmission.query.filter_by(
-            assignment_id=assignment_id, account_id=user_id
-        ).count()
+        # check the deadline and number of attempts in one atomic statement
+        user = current_account()
+        if not user:
+            return user_not_found()
+        user_id = user.id
+        claimed = claim_attempt(UUID(assignment_id), user_id)
+
+        if not claimed:
+            # only failed submissions pay for a lookup to explain the failure
+            assignment = db.session.get(Assignment, UUID(assignment_id))
+            if not assignment:
+                app.logger.warning(f"Assignment {assignment_id} not found")
+                return jsonify({"message": "Assignment not found"}), 404
+
+            if datetime.utcnow() > assignment.deadline:
+                app.logger.warning(
+                    f"Assignment {assignment_id} submission deadline passed"
+                )
+                return jsonify({"message": "Submission deadline has passed."}), 403
 
-        if submission_count >= assignment.num_of_attempts:
             app.logger.warning(
                 f"Maximum number of attempts exceeded for Assignment {assignment_id}"
             )
@@ -342,27 +725,33 @@ def submit_assignment(assignment_id):
 
         # create a new submission
         new_submission = AssignmentSubmission(
-            assignment_id=assignment.id,
+            assignment_id=UUID(assignment_id),
             account_id=user_id,
             submission_url=submission_url,
         )
         db.session.add(new_submission)
+
+        # stage the notification in the same transaction as the submission
+        topic_arn = os.getenv("SNS_TOPIC_ARN")
+        message = build_submission_message(
+            submission_url,
+            user.email,
+            user.first_name,
+            user.last_name,
+            assignment_id,
+            claimed.attempts,
+            claimed.num_of_attempts,
+            claimed.name,
+        )
+        outbox_id = add_to_outbox(topic_arn, message).id
         db.session.commit()
         app.logger.info(
             f"New submission for assignment {assignment_id} by user {user_id} created successfully."
         )
-        sns_response = post_to_sns(
-            submission_url,
-            auth.current_user().email,
-            auth.current_user().first_name,
-            auth.current_user().last_name,
-            os.getenv("SNS_TOPIC_ARN"),
-            assignment_id,
-            submission_count + 1,
-            assignment.num_of_attempts,
-            assignment.name,
-        )
-        app.logger.info(f"SNS response: {sns_response}")
+
+        # publish right away in the background, the outbox drain covers crashes
+        queued = sns_publisher.publish(topic_arn, message, key=outbox_id)
+        app.logger.info(f"SNS notification queued: {queued}")
         return jsonify(new_submission.to_dict()), 201
 
     except SQLAlchemyError as e:
@@ -0,0 +1,76 @@
+import os
+import uuid
+from collections import namedtuple
+
+from flask import Blueprint
+from flask import current_app as app
+from flask import jsonify
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from assignments import version
+from extensions import basic_auth, token_auth
+
+# create Blueprint for the token endpoint
+tokens_bp = Blueprint("tokens", __name__)
+
+# identity carried inside a token, mirrors the Account fields used by handlers
+TokenIdentity = namedtuple("TokenIdentity", ["id", "email", "first_name", "last_name"])
+
+
+class TokenSigner:
+    """Issues and verifies short-lived HMAC signed bearer tokens."""
+
+    def __init__(self, ttl=900):
+        self.ttl = ttl
+        self._serializer = None
+
+    def init_app(self, app):
+        self.ttl = int(os.getenv("TOKEN_TTL", self.ttl))
+        secret = app.config.get("SECRET_KEY")
+        if not secret:
+            app.logger.warning(
+                "SECRET_KEY not set, bearer tokens are only valid in this process"
+            )
+            secret = os.urandom(32)
+        self._serializer = URLSafeTimedSerializer(secret, salt="auth-token")
+
+    def issue(self, user):
+        return self._serializer.dumps(
+            [str(user.id), user.email, user.first_name, user.last_name]
+        )
+
+    def load(self, token):
+        try:
+            account_id, email, first_name, last_name = self._serializer.loads(
+                token, max_age=self.ttl
+            )
+            return TokenIdentity(uuid.UUID(account_id), email, first_name, last_name)
+        except (BadSignature, SignatureExpired, TypeError, ValueError):
+            return None
+
+
+token_signer = TokenSigner()
+
+
+# verify bearer tokens without touching the database
+@token_auth.verify_token
+def verify_token(token):
+    if not token:
+        return False
+    identity = token_signer.load(token)
+    if not identity:
+        app.logger.warning("Authentication failed for bearer token")
+        return False
+    return identity
+
+
+# exchange Basic credentials for a bearer token
+@tokens_bp.route(f"/{version}/token", methods=["POST"])
+@basic_auth.login_required
+def create_token():
+    user = basic_auth.current_user()
+    app.logger.info(f"Bearer token issued for user: {user.email}")
+    return (
+        jsonify({"token": token_signer.issue(user), "expires_in": token_signer.ttl}),
+        201,
+    )
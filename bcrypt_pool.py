@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+
+from per_process import PerProcess
+
+
+class BcryptPoolSaturated(RuntimeError):
+    pass
+
+
+# module level helpers so they can be pickled for a process executor
+def _hash(password, rounds, prefix):
+    salt = bcrypt.gensalt(rounds=rounds, prefix=prefix)
+    return bcrypt.hashpw(password.encode("UTF-8"), salt).decode("UTF-8")
+
+
+def _check(pw_hash, password):
+    return bcrypt.checkpw(password.encode("UTF-8"), pw_hash.encode("UTF-8"))
+
+
+def _run(fn, submitted, *args):
+    # report how long the job sat in the queue before a worker picked it up
+    started = time.time()
+    return fn(*args), started - submitted
+
+
+class BcryptPool(PerProcess):
+    """Runs bcrypt hashing and verification on a bounded worker pool.
+
+    Keeps CPU heavy work off the request thread and lets it scale across
+    cores with a process executor. Submissions beyond the queue size wait
+    for a free slot and fail once the queue timeout is exceeded.
+    """
+
+    def __init__(self, statsd=None):
+        self.statsd = statsd
+        self.kind = "thread"
+        self.workers = os.cpu_count() or 1
+        self.queue_size = 64
+        self.queue_timeout = 5.0
+        self.rounds = 12
+        self.prefix = b"2b"
+        self.pending = 0
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.kind = os.getenv("BCRYPT_EXECUTOR", self.kind)
+        self.workers = int(os.getenv("BCRYPT_WORKERS", self.workers))
+        self.queue_size = int(os.getenv("BCRYPT_QUEUE_SIZE", self.queue_size))
+        self.queue_timeout = float(
+            os.getenv("BCRYPT_QUEUE_TIMEOUT", self.queue_timeout)
+        )
+        self.rounds = app.config.get("BCRYPT_LOG_ROUNDS", self.rounds)
+        self.prefix = app.config.get("BCRYPT_HASH_PREFIX", "2b").encode("UTF-8")
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self.shutdown()
+
+    def _start_process(self):
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="bcrypt"
+            )
+
+    def _get_executor(self):
+        with self._lock:
+            self._ensure_process()
+            return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise BcryptPoolSaturated("bcrypt queue is full")
+        with self._lock:
+            self.pending += 1
+            depth = self.pending
+        if self.statsd:
+            self.statsd.gauge("csye6225_bcrypt_queue_depth", depth)
+        try:
+            future = self._get_executor().submit(_run, fn, time.time(), *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def result(self, future):
+        value, waited = future.result()
+        if self.statsd:
+            self.statsd.timing("csye6225_bcrypt_wait", waited * 1000)
+        return value
+
+    def hash(self, password):
+        return self.result(self.submit(_hash, password, self.rounds, self.prefix))
+
+    def hash_many(self, passwords):
+        # submit everything first so the hashes are computed in parallel
+        futures = [
+            self.submit(_hash, password, self.rounds, self.prefix)
+            for password in passwords
+        ]
+        return [self.result(future) for future in futures]
+
+    def check(self, pw_hash, password):
+        return self.result(self.submit(_check, pw_hash, password))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._owns_process():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._pid = None
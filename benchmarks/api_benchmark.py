@@ -0,0 +1,366 @@
+"""Measure latency, throughput and queries per request of the assignment API.
+
+Seeds accounts, assignments and submissions tagged with a run id, drives
+every route of the assignments blueprint in-process with a thread pool,
+and removes the seeded rows afterwards. SNS is replaced by a stub, so
+no notifications leave the machine. Results are printed as JSON so runs
+can be compared across commits:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.api_benchmark --requests 500 --concurrency 8
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, or_
+
+from app import app, bcrypt, create_tables
+from extensions import sns_publisher
+from models import (
+    Account,
+    Assignment,
+    AssignmentSubmission,
+    SubmissionAttempt,
+    SubmissionOutbox,
+    db,
+)
+from sns_publisher import StubSns
+
+ASSIGNMENT = {
+    "name": "Benchmark assignment",
+    "points": 10,
+    "num_of_attempts": 10,
+    "deadline": "2099-01-01T00:00:00",
+}
+
+
+class QueryCounter:
+    """Counts SQL statements per thread, so each request counts its own."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.local.count = getattr(self.local, "count", 0) + 1
+
+    def take(self):
+        count = getattr(self.local, "count", 0)
+        self.local.count = 0
+        return count
+
+
+def percentile(ordered, fraction):
+    # nearest rank on an already sorted list
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def seed(run_id, args):
+    """Create the accounts, assignments and submissions the routes work on."""
+    password = bcrypt.generate_password_hash("benchmark").decode("UTF-8")
+    accounts = [
+        Account(
+            email=f"{run_id}-{i}@example.com",
+            first_name="bench",
+            last_name="mark",
+            password=password,
+        )
+        for i in range(args.accounts)
+    ]
+    db.session.add_all(accounts)
+    db.session.flush()
+
+    deadline = datetime.utcnow() + timedelta(days=7)
+    assignments = [
+        Assignment(
+            name=f"{run_id} assignment {i}",
+            points=1 + i % 100,
+            num_of_attempts=10,
+            deadline=deadline,
+            account_id=accounts[i % len(accounts)].id,
+        )
+        for i in range(args.assignments + args.requests)
+    ]
+    db.session.add_all(assignments)
+    db.session.flush()
+
+    db.session.add_all(
+        AssignmentSubmission(
+            assignment_id=assignments[i % args.assignments].id,
+            account_id=accounts[i % len(accounts)].id,
+            submission_url=f"https://example.com/{run_id}/{i}.zip",
+        )
+        for i in range(args.submissions)
+    )
+    db.session.commit()
+
+    # the extra assignments are only used up by the delete route
+    return (
+        [(account.id, account.email) for account in accounts],
+        [(a.id, a.account_id) for a in assignments[: args.assignments]],
+        [(a.id, a.account_id) for a in assignments[args.assignments :]],
+    )
+
+
+def cleanup(run_id):
+    account_ids = db.session.query(Account.id).filter(Account.email.like(f"{run_id}-%"))
+    assignment_ids = db.session.query(Assignment.id).filter(
+        Assignment.account_id.in_(account_ids)
+    )
+    AssignmentSubmission.query.filter(
+        or_(
+            AssignmentSubmission.account_id.in_(account_ids),
+            AssignmentSubmission.assignment_id.in_(assignment_ids),
+        )
+    ).delete(synchronize_session=False)
+    SubmissionAttempt.query.filter(
+        or_(
+            SubmissionAttempt.account_id.in_(account_ids),
+            SubmissionAttempt.assignment_id.in_(assignment_ids),
+        )
+    ).delete(synchronize_session=False)
+    SubmissionOutbox.query.filter(SubmissionOutbox.payload.contains(run_id)).delete(
+        synchronize_session=False
+    )
+    Assignment.query.filter(Assignment.account_id.in_(account_ids)).delete(
+        synchronize_session=False
+    )
+    Account.query.filter(Account.email.like(f"{run_id}-%")).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+def routes(accounts, assignments, spare, tokens):
+    """Map a route name to a function building request i for that route."""
+    by_owner = {}
+    for assignment_id, owner_id in assignments:
+        by_owner.setdefault(owner_id, []).append(assignment_id)
+    owners = [
+        (account_id, email) for account_id, email in accounts if account_id in by_owner
+    ]
+
+    def header(account_id):
+        return {"Authorization": f"Bearer {tokens[account_id]}"}
+
+    def owned(i):
+        account_id, _ = owners[i % len(owners)]
+        ids = by_owner[account_id]
+        return account_id, ids[(i // len(owners)) % len(ids)]
+
+    def any_account(i):
+        return accounts[i % len(accounts)][0]
+
+    def submission_pair(i):
+        # spread submissions so each pair stays within its attempt limit
+        account_id = any_account(i)
+        return account_id, assignments[(i // len(accounts)) % len(assignments)][0]
+
+    def list_assignments(i):
+        return "GET", "/wed/assignments", {"headers": header(any_account(i))}
+
+    def list_page(i):
+        return (
+            "GET",
+            "/wed/assignments?limit=50",
+            {"headers": header(any_account(i))},
+        )
+
+    def detail(i):
+        assignment_id = assignments[i % len(assignments)][0]
+        return (
+            "GET",
+            f"/wed/assignments/{assignment_id}",
+            {"headers": header(any_account(i))},
+        )
+
+    def create(i):
+        return (
+            "POST",
+            "/wed/assignments",
+            {"headers": header(any_account(i)), "json": ASSIGNMENT},
+        )
+
+    def batch(i):
+        items = [dict(ASSIGNMENT, name=f"Batch {n}") for n in range(10)]
+        return (
+            "POST",
+            "/wed/assignments/batch",
+            {"headers": header(any_account(i)), "json": items},
+        )
+
+    def update(i):
+        account_id, assignment_id = owned(i)
+        return (
+            "PUT",
+            f"/wed/assignments/{assignment_id}",
+            {
+                "headers": header(account_id),
+                "json": dict(ASSIGNMENT, points=1 + i % 100),
+            },
+        )
+
+    def submissions(i):
+        account_id, assignment_id = owned(i)
+        return (
+            "GET",
+            f"/wed/assignments/{assignment_id}/submissions?limit=50",
+            {"headers": header(account_id)},
+        )
+
+    def submit(i):
+        account_id, assignment_id = submission_pair(i)
+        return (
+            "POST",
+            f"/wed/assignments/{assignment_id}/submission",
+            {
+                "headers": header(account_id),
+                "json": {"submission_url": f"https://example.com/{i}.zip"},
+            },
+        )
+
+    def delete(i):
+        assignment_id, owner_id = spare[i % len(spare)]
+        return (
+            "DELETE",
+            f"/wed/assignments/{assignment_id}",
+            {"headers": header(owner_id)},
+        )
+
+    return {
+        "list_assignments": list_assignments,
+        "list_assignments_page": list_page,
+        "get_assignment_detail": detail,
+        "create_assignment": create,
+        "batch_assignments": batch,
+        "update_assignment": update,
+        "get_submissions": submissions,
+        "submit_assignment": submit,
+        "delete_assignment": delete,
+    }
+
+
+def run_route(build, requests, concurrency, counter):
+    local = threading.local()
+
+    def one(i):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        method, path, kwargs = build(i)
+        counter.take()
+        started = time.perf_counter()
+        response = local.client.open(path, method=method, **kwargs)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        return elapsed, counter.take(), response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed * 1000 for elapsed, _, _ in results)
+    statuses = {}
+    for _, _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "requests": requests,
+        "statuses": statuses,
+        "rps": round(requests / wall, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "queries_per_request": round(
+            sum(queries for _, queries, _ in results) / requests, 2
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--assignments", type=int, default=200)
+    parser.add_argument("--submissions", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200, help="Per route.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="Per route.")
+    parser.add_argument(
+        "--routes", default=None, help="Comma separated routes, default all."
+    )
+    args = parser.parse_args()
+
+    run_id = f"benchmark-{time.time_ns()}"
+    os.environ.setdefault("SNS_TOPIC_ARN", "arn:aws:sns:local:000000000000:benchmark")
+    sns_publisher.client = StubSns()
+    create_tables()
+
+    with app.app_context():
+        engine = db.engine
+        counter = QueryCounter()
+        try:
+            accounts, assignments, spare = seed(run_id, args)
+            client = app.test_client()
+            tokens = {}
+            for account_id, email in accounts:
+                response = client.post("/wed/token", auth=(email, "benchmark"))
+                tokens[account_id] = response.get_json()["token"]
+
+            selected = routes(accounts, assignments, spare, tokens)
+            if args.routes:
+                selected = {name: selected[name] for name in args.routes.split(",")}
+
+            event.listen(engine, "before_cursor_execute", counter)
+            results = {}
+            for name, build in selected.items():
+                if args.warmup and name != "delete_assignment":
+                    run_route(build, args.warmup, args.concurrency, counter)
+                results[name] = run_route(
+                    build, args.requests, args.concurrency, counter
+                )
+            sns_publisher.flush(timeout=10)
+        finally:
+            if event.contains(engine, "before_cursor_execute", counter):
+                event.remove(engine, "before_cursor_execute", counter)
+            db.session.rollback()
+            cleanup(run_id)
+
+    print(
+        json.dumps(
+            {
+                "commit": git_commit(),
+                "config": {
+                    "accounts": args.accounts,
+                    "assignments": args.assignments,
+                    "submissions": args.submissions,
+                    "requests": args.requests,
+                    "concurrency": args.concurrency,
+                },
+                "routes": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare ORM to_dict serialization with the column projected encoder.
+
+Seeds assignments inside a transaction that is rolled back afterwards, so
+it can be pointed at any database the app can reach:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.serializer_benchmark --rows 5000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from flask import jsonify
+
+from app import app, create_tables
+from models import Account, Assignment, db
+from serializers import assignment_encoder, json_response
+
+
+def orm_to_dict():
+    assignments = Assignment.query.all()
+    return jsonify([assignment.to_dict() for assignment in assignments]).get_data()
+
+
+def projected():
+    rows = db.session.execute(assignment_encoder.select()).all()
+    return json_response(assignment_encoder.encode_many(rows)).get_data()
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        # start from an empty identity map so the ORM hydrates every row
+        db.session.expunge_all()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    create_tables()
+    with app.test_request_context():
+        account = Account(
+            email=f"benchmark-{time.time_ns()}@example.com",
+            first_name="bench",
+            last_name="mark",
+            password="unused",
+        )
+        db.session.add(account)
+        db.session.flush()
+        deadline = datetime.utcnow() + timedelta(days=7)
+        db.session.add_all(
+            Assignment(
+                name=f"Assignment {i} ünïcode",
+                points=1 + i % 100,
+                num_of_attempts=1 + i % 10,
+                deadline=deadline,
+                account_id=account.id,
+            )
+            for i in range(args.rows)
+        )
+        db.session.flush()
+
+        try:
+            if orm_to_dict() != projected():
+                raise SystemExit("projected output differs from to_dict output")
+            orm_seconds = best_of(orm_to_dict, args.repeat)
+            projected_seconds = best_of(projected, args.repeat)
+        finally:
+            db.session.rollback()
+
+    print(
+        json.dumps(
+            {
+                "seeded_rows": args.rows,
+                "orm_to_dict_ms": round(orm_seconds * 1000, 3),
+                "projected_ms": round(projected_seconds * 1000, 3),
+                "speedup": round(orm_seconds / projected_seconds, 2),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
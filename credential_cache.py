@@ -0,0 +1,83 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CredentialCache:
+    """Bounded TTL cache of recently verified Basic auth credentials.
+
+    Entries are keyed by an HMAC of email and password so the plaintext
+    password is never held in memory after the request that verified it.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_size = int(os.getenv("AUTH_CACHE_SIZE", self.max_size))
+        self.ttl = int(os.getenv("AUTH_CACHE_TTL", self.ttl))
+        secret = app.config.get("SECRET_KEY")
+        if secret:
+            self._key = hashlib.sha256(secret.encode("UTF-8")).digest()
+        self.clear()
+
+    def _make_key(self, email, password):
+        message = f"{email}\0{password}".encode("UTF-8")
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def get(self, email, password):
+        """Return (account_id, password_hash) for a cached credential or None."""
+        if self.max_size <= 0:
+            return None
+        key = self._make_key(email, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[3] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def add(self, email, password, account_id, password_hash):
+        if self.max_size <= 0:
+            return
+        key = self._make_key(email, password)
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (email, account_id, password_hash, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, email):
+        # drop every cached credential for the account, e.g. on password change
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[0] == email]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
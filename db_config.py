@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool
+
+from extensions import statsd
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long callers wait for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            statsd.timing(
+                "csye6225_db_pool_checkout_wait",
+                (time.perf_counter() - started) * 1000,
+            )
+
+
+def _env_flag(name, default="false"):
+    return os.getenv(name, default).lower() == "true"
+
+
+def engine_options():
+    """Build SQLALCHEMY_ENGINE_OPTIONS from the environment."""
+    connect_args = {"connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", 5))}
+    statement_timeout = os.getenv("DB_STATEMENT_TIMEOUT_MS")
+
+    # PgBouncer already pools connections, so do not hold any here. psycopg2
+    # never uses server side prepared statements, and startup options such as
+    # statement_timeout are rejected by PgBouncer, so they are not sent.
+    if _env_flag("DB_PGBOUNCER"):
+        return {"poolclass": NullPool, "connect_args": connect_args}
+
+    if statement_timeout:
+        connect_args["options"] = f"-c statement_timeout={int(statement_timeout)}"
+
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", "true"),
+        "connect_args": connect_args,
+    }
+
+
+def register_pool_metrics(engine):
+    # count connections handed out, works for any pool class
+    in_use = [0]
+    lock = threading.Lock()
+
+    def report(delta):
+        with lock:
+            in_use[0] += delta
+            current = in_use[0]
+        statsd.gauge("csye6225_db_pool_in_use", current)
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        report(1)
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        report(-1)
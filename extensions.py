@@ -1,4 +1,38 @@
-from flask_httpauth import HTTPBasicAuth
+from flask_httpauth import HTTPBasicAuth, HTTPTokenAuth, MultiAuth
 
-# Initialize the HTTPBasicAuth
-auth = HTTPBasicAuth()
\ No newline at end of file
+from bcrypt_pool import BcryptPool
+from credential_cache import CredentialCache
+from instrumentation import BufferedStatsClient, RequestMetrics
+from log_queue import QueuedLogging
+from profiling import RequestProfiler
+from sns_publisher import SnsPublisher
+from traffic import TrafficRecorder
+
+# Initialize the HTTPBasicAuth and bearer token auth, routes accept either
+basic_auth = HTTPBasicAuth()
+token_auth = HTTPTokenAuth(scheme="Bearer")
+auth = MultiAuth(basic_auth, token_auth)
+
+# Statsd Metrics, buffered and sent in batches
+statsd = BufferedStatsClient("localhost", 8125)
+
+# Latency, status and response size metrics for every request
+request_metrics = RequestMetrics(statsd)
+
+# Cache of verified credentials to skip bcrypt on repeat requests
+credential_cache = CredentialCache()
+
+# Worker pool for bcrypt hashing and verification
+bcrypt_pool = BcryptPool(statsd)
+
+# Background publisher for submission notifications
+sns_publisher = SnsPublisher(statsd)
+
+# Queue that moves log formatting and file writes off request threads
+queued_logging = QueuedLogging(statsd)
+
+# Opt-in cProfile capture of selected requests
+request_profiler = RequestProfiler()
+
+# Opt-in capture of sanitized request records for later replay
+traffic_recorder = TrafficRecorder(statsd)
@@ -0,0 +1,42 @@
+# gunicorn settings for `flask serve`, read from the environment
+import multiprocessing
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Load environment variables the same way app.py does
+if os.path.exists("/opt/webapp.properties"):
+    load_dotenv("/opt/webapp.properties")
+else:
+    load_dotenv()
+
+# each worker signs bearer tokens, without a shared key a token issued by
+# one worker is rejected by all the others
+if not os.getenv("SECRET_KEY"):
+    sys.exit("SECRET_KEY must be set to serve the app with several workers")
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("WEB_THREADS", 4))
+worker_class = "gthread"
+timeout = int(os.getenv("WEB_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("WEB_KEEPALIVE", 5))
+
+# recycle workers periodically, jitter avoids restarting them all at once
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", 100))
+
+# load the app once in the master and fork it into the workers
+preload_app = os.getenv("WEB_PRELOAD", "false").lower() == "true"
+
+
+def post_fork(server, worker):
+    # pooled connections opened by the master must not be shared with workers
+    if "app" in sys.modules:
+        from app import app
+        from models import db
+
+        with app.app_context():
+            db.engine.dispose(close=False)
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from sqlalchemy import text
+
+from models import db
+from per_process import PerProcess
+
+
+class HealthProbe(PerProcess):
+    """Checks database connectivity through the shared engine pool.
+
+    Probes are single-flight: concurrent health checks wait on the probe
+    already in progress instead of opening more connections, and give up
+    after a bounded timeout. The same timeout is set as the probe's
+    statement_timeout, so a hung query is cancelled by the server and its
+    pooled connection is released. Results can be cached for a few
+    seconds, or refreshed by a background thread so a check only reads
+    the cache.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.query = "SELECT 1"
+        self.timeout = 2.0
+        self.cache_seconds = 0.0
+        self.background = False
+        self._healthy = False
+        self._checked_at = None
+        self._inflight = None
+        self._executor = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.timeout = float(os.getenv("HEALTHZ_TIMEOUT", self.timeout))
+        self.cache_seconds = float(
+            os.getenv("HEALTHZ_CACHE_SECONDS", self.cache_seconds)
+        )
+        self.background = os.getenv("HEALTHZ_BACKGROUND", "false").lower() == "true"
+
+    def _probe(self):
+        timeout = int(self.timeout * 1000)
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    # SET LOCAL ends with the transaction, the pooled
+                    # connection goes back without a timeout
+                    connection.execute(text(f"SET LOCAL statement_timeout = {timeout}"))
+                    connection.execute(text(self.query))
+            healthy = True
+        except Exception as e:
+            self.app.logger.error(f"Database connection failed for health check: {e}")
+            healthy = False
+        with self._lock:
+            self._healthy = healthy
+            self._checked_at = time.monotonic()
+        return healthy
+
+    def _run_background(self):
+        interval = self.cache_seconds or 5.0
+        while True:
+            self._probe()
+            time.sleep(interval)
+
+    def _start_process(self):
+        self._inflight = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="healthz")
+        if self.background:
+            self._thread = threading.Thread(
+                target=self._run_background, name="healthz-background", daemon=True
+            )
+            self._thread.start()
+
+    def _is_fresh(self, max_age):
+        return (
+            self._checked_at is not None
+            and time.monotonic() - self._checked_at < max_age
+        )
+
+    def check(self):
+        with self._lock:
+            self._ensure_process()
+            if self.background and self._checked_at is not None:
+                # a stale background result means the prober itself is stuck
+                max_age = max(self.cache_seconds or 5.0, self.timeout) * 3
+                return self._healthy and self._is_fresh(max_age)
+            if self.cache_seconds and self._is_fresh(self.cache_seconds):
+                return self._healthy
+            if self._inflight is None or self._inflight.done():
+                self._inflight = self._executor.submit(self._probe)
+            inflight = self._inflight
+
+        try:
+            return inflight.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.app.logger.error(
+                f"Database health check timed out after {self.timeout} seconds"
+            )
+            return False
+
+
+health_probe = HealthProbe()
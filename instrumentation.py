@@ -0,0 +1,206 @@
+import atexit
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from statsd import StatsClient
+
+from per_process import PerProcess
+
+
+class BufferedStatsClient(PerProcess, StatsClient):
+    """StatsClient that sends metrics in batches instead of one per packet.
+
+    Metrics are buffered and written as newline separated lines in a single
+    UDP packet once STATSD_BATCH_SIZE metrics are pending, the packet would
+    exceed STATSD_MAX_PACKET bytes, or STATSD_FLUSH_INTERVAL_MS has passed.
+    Metrics may carry tags, sent in the DogStatsD format the CloudWatch
+    agent reads as dimensions.
+    """
+
+    def __init__(self, host="localhost", port=8125, prefix=None, maxudpsize=1432):
+        super().__init__(host, port, prefix, maxudpsize)
+        self.batch_size = 50
+        self.interval = 1.0
+        self._buffer = []
+        self._size = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        host = os.getenv("STATSD_HOST", "localhost")
+        port = int(os.getenv("STATSD_PORT", 8125))
+        address = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_DGRAM)
+        self._addr = address[0][4]
+        self._maxudpsize = int(os.getenv("STATSD_MAX_PACKET", self._maxudpsize))
+        self.batch_size = int(os.getenv("STATSD_BATCH_SIZE", self.batch_size))
+        self.interval = int(os.getenv("STATSD_FLUSH_INTERVAL_MS", 1000)) / 1000
+
+    def _start_process(self):
+        self._buffer = []
+        self._size = 0
+        self._thread = threading.Thread(
+            target=self._run, name="statsd-flush", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def _send(self, data):
+        with self._lock:
+            self._ensure_process()
+            if self._buffer and self._size + len(data) + 1 > self._maxudpsize:
+                self._write(self._take())
+            self._buffer.append(data)
+            self._size += len(data) + 1
+            if len(self._buffer) < self.batch_size:
+                return
+            packet = self._take()
+        self._write(packet)
+
+    def _take(self):
+        packet = "\n".join(self._buffer)
+        self._buffer = []
+        self._size = 0
+        return packet
+
+    def _write(self, packet):
+        try:
+            self._sock.sendto(packet.encode("ascii"), self._addr)
+        except (socket.error, RuntimeError):
+            pass
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            packet = self._take()
+        self._write(packet)
+
+    def _send_stat(self, stat, value, rate, tags=None):
+        data = self._prepare(stat, value, rate)
+        if data and tags:
+            data += "|#" + ",".join(f"{key}:{tag}" for key, tag in tags.items())
+        self._after(data)
+
+    def incr(self, stat, count=1, rate=1, tags=None):
+        self._send_stat(stat, f"{count}|c", rate, tags)
+
+    def timing(self, stat, delta, rate=1, tags=None):
+        if isinstance(delta, timedelta):
+            delta = delta.total_seconds() * 1000.0
+        self._send_stat(stat, "%0.6f|ms" % delta, rate, tags)
+
+    def gauge(self, stat, value, rate=1, delta=False, tags=None):
+        if tags is None:
+            return super().gauge(stat, value, rate, delta)
+        prefix = "+" if delta and value >= 0 else ""
+        self._send_stat(stat, f"{prefix}{value}|g", rate, tags)
+
+
+class RequestMetrics:
+    """Times every request and reports it tagged by endpoint, method and status.
+
+    Sends the csye6225_request_duration timer, a csye6225_request counter
+    and a csye6225_response_size gauge for responses with a known length.
+    Once an engine is watched, the number of SQL statements and the time
+    spent in the database are added to the metrics and to one structured
+    log line per request, and statements slower than SLOW_QUERY_MS are
+    logged with their parameters redacted.
+    """
+
+    def __init__(self, statsd):
+        self.statsd = statsd
+        self.app = None
+        self.slow_query_ms = 200.0
+
+    def init_app(self, app):
+        self.app = app
+        self.slow_query_ms = float(os.getenv("SLOW_QUERY_MS", self.slow_query_ms))
+        app.before_request(self.start_timer)
+        app.after_request(self.record)
+
+    def watch_engine(self, engine):
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+        event.listen(engine, "handle_error", self.handle_error)
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        elapsed = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+        if has_request_context() and "request_started" in g:
+            g.query_count += 1
+            g.query_time += elapsed
+        if elapsed >= self.slow_query_ms:
+            self.log_slow_query(statement, parameters, elapsed)
+
+    def handle_error(self, context):
+        # a failed statement never reaches after_cursor_execute
+        if context.connection is not None and context.connection.info.get(
+            "query_started"
+        ):
+            context.connection.info["query_started"].pop()
+
+    def log_slow_query(self, statement, parameters, elapsed):
+        # only parameter names are logged, values may hold credentials
+        if isinstance(parameters, (list, tuple)) and parameters:
+            parameters = parameters[0]
+        names = sorted(parameters) if isinstance(parameters, dict) else []
+        self.statsd.incr("csye6225_slow_query")
+        self.app.logger.warning(
+            f"Slow query took {elapsed:.1f}ms: {' '.join(statement.split())} "
+            f"parameters: {dict.fromkeys(names, '<redacted>')}"
+        )
+
+    def start_timer(self):
+        g.request_started = time.perf_counter()
+        g.query_count = 0
+        g.query_time = 0.0
+
+    def record(self, response):
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        endpoint = (request.endpoint or "unknown").split(".")[-1]
+        tags = {
+            "endpoint": endpoint,
+            "method": request.method.lower(),
+            "status": response.status_code,
+        }
+        elapsed = (time.perf_counter() - started) * 1000
+        self.statsd.timing("csye6225_request_duration", elapsed, tags=tags)
+        self.statsd.incr("csye6225_request", tags=tags)
+        self.statsd.timing("csye6225_request_db_time", g.query_time, tags=tags)
+        self.statsd.gauge("csye6225_request_queries", g.query_count, tags=tags)
+        if response.content_length is not None:
+            self.statsd.gauge(
+                "csye6225_response_size", response.content_length, tags=tags
+            )
+        self.app.logger.info(
+            f"{request.method} {request.path} returned {response.status_code} "
+            f"in {elapsed:.1f}ms with {g.query_count} queries "
+            f"({g.query_time:.1f}ms in database)",
+            extra={
+                "endpoint": endpoint,
+                "method": request.method,
+                "status": response.status_code,
+                "duration_ms": round(elapsed, 3),
+                "query_count": g.query_count,
+                "db_time_ms": round(g.query_time, 3),
+            },
+        )
+        return response
@@ -1,8 +1,114 @@
+import base64
+import json
+import logging
+import socket
+import os
+import tempfile
+import threading
+import time
 import unittest
-from app import app
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import delete, event, select, text
+
+from app import app, bcrypt, create_tables, file_handler
+from bcrypt_pool import BcryptPool, BcryptPoolSaturated
+from extensions import (
+    bcrypt_pool,
+    credential_cache,
+    queued_logging,
+    request_metrics,
+    request_profiler,
+    sns_publisher,
+    statsd,
+)
+from health import HealthProbe, health_probe
+from instrumentation import BufferedStatsClient
+from log_queue import QueuedLogging
+from models import Account, Assignment, AssignmentSubmission, SubmissionOutbox, db
+from outbox import add_to_outbox, drain_outbox
+from populate_db import populate_db
+from profiling import summarize
+from sns_publisher import StubSns
+from traffic import TrafficRecorder, make_sender, read_capture, replay
+
+
+def create_account(password="secret"):
+    with app.app_context():
+        account = Account(
+            email=f"{uuid.uuid4()}@example.com",
+            first_name="test",
+            last_name="user",
+            password=bcrypt.generate_password_hash(password).decode("UTF-8"),
+        )
+        db.session.add(account)
+        db.session.commit()
+        return account.email
+
+
+def basic_auth_header(email, password="secret"):
+    credentials = base64.b64encode(f"{email}:{password}".encode()).decode()
+    return {"Authorization": f"Basic {credentials}"}
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(statement):
+    # disable sequential scans so the plan shows whether an index is usable
+    with app.app_context():
+        with db.engine.connect() as connection:
+            connection.execute(text("SET enable_seqscan = off"))
+            compiled = statement.compile(
+                dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+            )
+            rows = connection.execute(text(f"EXPLAIN {compiled}"))
+            return "\n".join(row[0] for row in rows)
+
+
+ASSIGNMENT = {
+    "name": "Assignment 1",
+    "points": 10,
+    "num_of_attempts": 2,
+    "deadline": "2099-01-01T00:00:00",
+}
+
+
+class FakeSns(StubSns):
+    # records messages and fails the first call to force a retry
+    def __init__(self):
+        self.calls = 0
+        self.messages = []
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("SNS unavailable")
+        self.messages.extend(entry["Message"] for entry in PublishBatchRequestEntries)
+        return super().publish_batch(TopicArn, PublishBatchRequestEntries)
 
 
 class IntegrationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+
     def test_healthz(self):
         print("Running test_healthz...")
 
@@ -21,6 +127,863 @@ class IntegrationTest(unittest.TestCase):
         else:
             print("Test did not run successfully.")
 
+    def test_healthz_timeout(self):
+        print("Running test_healthz_timeout...")
+
+        probe = HealthProbe()
+        probe.init_app(app)
+        probe.timeout = 0.2
+        probe.query = "SELECT pg_sleep(5)"
+        started = time.monotonic()
+        self.assertFalse(probe.check())
+        # the server cancels the query, the probe ends long before pg_sleep
+        self.assertFalse(probe._inflight.result(timeout=2))
+        self.assertLess(time.monotonic() - started, 2)
+
+        # the pooled connection comes back without the probe's timeout
+        with app.app_context():
+            with db.engine.connect() as connection:
+                setting = connection.execute(text("SHOW statement_timeout")).scalar()
+        self.assertEqual(setting, "0")
+
+        client = app.test_client()
+        query = health_probe.query
+        health_probe.query = "SELECT 1 / 0"
+        try:
+            response = client.get("/healthz")
+            self.assertEqual(response.status_code, 503)
+        finally:
+            health_probe.query = query
+        self.assertEqual(client.get("/healthz").status_code, 200)
+
+    def test_credential_cache(self):
+        print("Running test_credential_cache...")
+
+        client = app.test_client()
+        email = create_account()
+        credential_cache.clear()
+
+        response = client.get("/wed/assignments", headers=basic_auth_header(email))
+        self.assertEqual(response.status_code, 200)
+        response = client.get("/wed/assignments", headers=basic_auth_header(email))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(credential_cache.stats()["hits"], 1)
+
+        # a wrong password must never be served from the cache
+        response = client.get(
+            "/wed/assignments", headers=basic_auth_header(email, "wrong")
+        )
+        self.assertEqual(response.status_code, 401)
+
+        # changing the password invalidates the cached credential
+        with app.app_context():
+            account = Account.query.filter_by(email=email).first()
+            account.password = bcrypt.generate_password_hash("changed").decode("UTF-8")
+            db.session.commit()
+        self.assertEqual(credential_cache.stats()["size"], 0)
+        response = client.get("/wed/assignments", headers=basic_auth_header(email))
+        self.assertEqual(response.status_code, 401)
+
+    def test_bearer_token(self):
+        print("Running test_bearer_token...")
+
+        client = app.test_client()
+        email = create_account()
+
+        response = client.post("/wed/token", headers=basic_auth_header(email))
+        self.assertEqual(response.status_code, 201)
+        token = response.get_json()["token"]
+
+        headers = {"Authorization": f"Bearer {token}"}
+        response = client.get("/wed/assignments", headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        headers = {"Authorization": f"Bearer {token}x"}
+        response = client.get("/wed/assignments", headers=headers)
+        self.assertEqual(response.status_code, 401)
+
+        # a token outlives its account, writes must not reach the foreign key
+        with app.app_context():
+            Account.query.filter_by(email=email).delete()
+            db.session.commit()
+        headers = {"Authorization": f"Bearer {token}"}
+        response = client.post("/wed/assignments", json=ASSIGNMENT, headers=headers)
+        self.assertEqual(response.status_code, 403)
+
+    def test_bcrypt_pool_saturation(self):
+        print("Running test_bcrypt_pool_saturation...")
+
+        os.environ["BCRYPT_QUEUE_SIZE"] = "1"
+        os.environ["BCRYPT_QUEUE_TIMEOUT"] = "0.05"
+        try:
+            pool = BcryptPool()
+            pool.init_app(Flask(__name__))
+        finally:
+            del os.environ["BCRYPT_QUEUE_SIZE"]
+            del os.environ["BCRYPT_QUEUE_TIMEOUT"]
+        release = threading.Event()
+        try:
+            pool.submit(release.wait)
+            with self.assertRaises(BcryptPoolSaturated):
+                pool.submit(release.wait)
+        finally:
+            release.set()
+            pool.shutdown()
+
+        # a saturated pool must reject the login, never let it through
+        def saturated(pw_hash, password):
+            raise BcryptPoolSaturated("bcrypt queue is full")
+
+        client = app.test_client()
+        email = create_account()
+        credential_cache.clear()
+        check = bcrypt_pool.check
+        bcrypt_pool.check = saturated
+        try:
+            headers = basic_auth_header(email, "wrong")
+            response = client.get("/wed/assignments", headers=headers)
+            self.assertEqual(response.status_code, 503)
+            response = client.post("/wed/token", headers=headers)
+            self.assertEqual(response.status_code, 503)
+        finally:
+            bcrypt_pool.check = check
+
+    def test_write_query_count(self):
+        print("Running test_write_query_count...")
+
+        client = app.test_client()
+        email = create_account()
+        headers = basic_auth_header(email)
+
+        # authentication loads the account once, handlers reuse it
+        with count_queries() as statements:
+            response = client.post("/wed/assignments", json=ASSIGNMENT, headers=headers)
+        self.assertEqual(response.status_code, 201)
+        account_queries = [s for s in statements if "FROM account" in s]
+        self.assertEqual(len(account_queries), 1)
+        self.assertEqual(len(statements), 3)
+
+        assignment_id = response.get_json()["id"]
+        with count_queries() as statements:
+            response = client.delete(
+                f"/wed/assignments/{assignment_id}", headers=headers
+            )
+        self.assertEqual(response.status_code, 204)
+        account_queries = [s for s in statements if "FROM account" in s]
+        self.assertEqual(len(account_queries), 1)
+
+    def test_assignment_pagination(self):
+        print("Running test_assignment_pagination...")
+
+        client = app.test_client()
+        headers = basic_auth_header(create_account())
+        for _ in range(3):
+            client.post("/wed/assignments", json=ASSIGNMENT, headers=headers)
+
+        seen = []
+        cursor = ""
+        while True:
+            response = client.get(
+                f"/wed/assignments?limit=2&cursor={cursor}", headers=headers
+            )
+            self.assertEqual(response.status_code, 200)
+            page = response.get_json()
+            self.assertLessEqual(len(page["assignments"]), 2)
+            seen.extend(assignment["id"] for assignment in page["assignments"])
+            if not page["next"]:
+                break
+            cursor = page["next"]
+
+        response = client.get("/wed/assignments", headers=headers)
+        everything = [assignment["id"] for assignment in response.get_json()]
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(sorted(seen), sorted(everything))
+
+        # streamed pages match the buffered ones
+        response = client.get("/wed/assignments?stream=true", headers=headers)
+        self.assertTrue(response.is_streamed)
+        streamed = [assignment["id"] for assignment in response.get_json()]
+        self.assertEqual(sorted(streamed), sorted(everything))
+
+        # both carry the same strong ETag, so the bytes must match too
+        buffered = client.get("/wed/assignments", headers=headers)
+        streamed = client.get("/wed/assignments?stream=true", headers=headers)
+        self.assertEqual(streamed.data, buffered.data)
+        self.assertEqual(streamed.headers["ETag"], buffered.headers["ETag"])
+        response = client.get("/wed/assignments?limit=2&stream=1", headers=headers)
+        page = response.get_json()
+        self.assertEqual(len(page["assignments"]), 2)
+        self.assertIsNotNone(page["next"])
+
+        response = client.get("/wed/assignments?cursor=bogus", headers=headers)
+        self.assertEqual(response.status_code, 400)
+        response = client.get("/wed/assignments?sort=name", headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_conditional_get(self):
+        print("Running test_conditional_get...")
+
+        client = app.test_client()
+        headers = basic_auth_header(create_account())
+        response = client.post("/wed/assignments", json=ASSIGNMENT, headers=headers)
+        url = f"/wed/assignments/{response.get_json()['id']}"
+
+        for path in ("/wed/assignments", url):
+            response = client.get(path, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers["ETag"]
+            response = client.get(path, headers={**headers, "If-None-Match": etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b"")
+
+        # an update produces a new representation and a new ETag
+        client.put(url, json={**ASSIGNMENT, "points": 20}, headers=headers)
+        response = client.get(url, headers={**headers, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["points"], 20)
+
+        # pages never aggregate the whole table, their ETag comes from their rows
+        with count_queries() as statements:
+            response = client.get("/wed/assignments?limit=5", headers=headers)
+            etag = response.headers["ETag"]
+            page = {**headers, "If-None-Match": etag}
+            response = client.get("/wed/assignments?limit=5", headers=page)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([s for s in statements if "count(" in s.lower()])
+
+        # without If-None-Match the full listing skips the aggregate too
+        with count_queries() as statements:
+            response = client.get("/wed/assignments", headers=headers)
+        self.assertFalse([s for s in statements if "count(" in s.lower()])
+        listing = {**headers, "If-None-Match": response.headers["ETag"]}
+        response = client.get("/wed/assignments", headers=listing)
+        self.assertEqual(response.status_code, 304)
+
+    def test_projected_serializer(self):
+        print("Running test_projected_serializer...")
+
+        client = app.test_client()
+        headers = basic_auth_header(create_account())
+        data = {**ASSIGNMENT, "name": 'Ünïcode "quoted" \\ name'}
+        response = client.post("/wed/assignments", json=data, headers=headers)
+        created = response.get_data()
+
+        # the column projected read path matches to_dict byte for byte
+        response = client.get(
+            f"/wed/assignments/{response.get_json()['id']}", headers=headers
+        )
+        self.assertEqual(response.get_data(), created)
+
+    def test_submission_published_in_background(self):
+        print("Running test_submission_published_in_background...")
+
+        client = app.test_client()
+        headers = basic_auth_header(create_account())
+        response = client.post("/wed/assignments", json=ASSIGNMENT, headers=headers)
+        assignment_id = response.get_json()["id"]
+
+        sns_publisher.client = FakeSns()
+        sns_publisher.backoff = 0.01
+        try:
+            response = client.post(
+                f"/wed/assignments/{assignment_id}/submission",
+                json={"submission_url": "https://example.com/submission.zip"},
+                headers=headers,
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertTrue(sns_publisher.flush(timeout=5))
+            self.assertEqual(sns_publisher.client.calls, 2)
+            self.assertEqual(len(sns_publisher.client.messages), 1)
+            self.assertIn(assignment_id, sns_publisher.client.messages[0])
+
+            # delivered notifications are cleared from the outbox
+            with app.app_context():
+                payloads = [row.payload for row in SubmissionOutbox.query.all()]
+            self.assertFalse(any(assignment_id in payload for payload in payloads))
+        finally:
+            sns_publisher.client = None
+
+    def test_outbox_drain(self):
+        print("Running test_outbox_drain...")
+
+        # a notification whose process died before publishing it
+        with app.app_context():
+            add_to_outbox("arn:test", {"assignment_id": "left-behind"})
+            db.session.commit()
+
+        sns_publisher.client = FakeSns()
+        sns_publisher.backoff = 0.01
+        try:
+            with app.app_context():
+                published = drain_outbox(app, batch_size=10, grace_seconds=0)
+                self.assertGreaterEqual(published, 1)
+                self.assertEqual(SubmissionOutbox.query.count(), 0)
+            self.assertIn("left-behind", "".join(sns_publisher.client.messages))
+        finally:
+            sns_publisher.client = None
+
+    def test_outbox_drain_respects_sns_batch_limit(self):
+        print("Running test_outbox_drain_respects_sns_batch_limit...")
+
+        class LimitedSns(StubSns):
+            # rejects batches SNS itself would refuse
+            def __init__(self):
+                self.messages = []
+
+            def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+                if len(PublishBatchRequestEntries) > 10:
+                    raise ValueError("Too many entries in batch request")
+                self.messages.extend(e["Message"] for e in PublishBatchRequestEntries)
+                return super().publish_batch(TopicArn, PublishBatchRequestEntries)
+
+        # a backlog built up while SNS was unavailable
+        with app.app_context():
+            for i in range(25):
+                add_to_outbox("arn:test", {"assignment_id": f"backlog-{i}"})
+            db.session.commit()
+
+        sns_publisher.client = LimitedSns()
+        sns_publisher.backoff = 0.01
+        try:
+            with app.app_context():
+                published = drain_outbox(app, batch_size=100, grace_seconds=0)
+                self.assertEqual(published, 25)
+                self.assertEqual(SubmissionOutbox.query.count(), 0)
+            self.assertEqual(len(sns_publisher.client.messages), 25)
+        finally:
+            sns_publisher.client = None
+
+    def test_concurrent_submissions_respect_attempt_limit(self):
+        print("Running test_concurrent_submissions_respect_attempt_limit...")
+
+        client = app.test_client()
+        headers = basic_auth_header(create_account())
+        response = client.post("/wed/assignments", json=ASSIGNMENT, headers=headers)
+        url = f"/wed/assignments/{response.get_json()['id']}/submission"
+        token = client.post("/wed/token", headers=headers).get_json()["token"]
+
+        barrier = threading.Barrier(8)
+        statuses = []
+
+        def submit():
+            thread_client = app.test_client()
+            barrier.wait()
+            response = thread_client.post(
+                url,
+                json={"submission_url": "https://example.com/submission.zip"},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            statuses.append(response.status_code)
+
+        sns_publisher.client = FakeSns()
+        try:
+            threads = [threading.Thread(target=submit) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            sns_publisher.flush(timeout=5)
+        finally:
+            sns_publisher.client = None
+
+        # num_of_attempts is 2, the rest must be rejected
+        self.assertEqual(sorted(statuses), [201, 201] + [403] * 6)
+
+    def test_assignment_batch(self):
+        print("Running test_assignment_batch...")
+
+        client = app.test_client()
+        headers = basic_auth_header(create_account())
+        response = client.post("/wed/assignments", json=ASSIGNMENT, headers=headers)
+        existing_id = response.get_json()["id"]
+        other = client.post(
+            "/wed/assignments",
+            json=ASSIGNMENT,
+            headers=basic_auth_header(create_account()),
+        ).get_json()["id"]
+
+        batch = [dict(ASSIGNMENT, name=f"Batch {i}") for i in range(20)]
+        batch += [
+            dict(ASSIGNMENT, points=0),
+            dict(ASSIGNMENT, id=existing_id, name="Renamed"),
+            dict(ASSIGNMENT, id=other),
+            dict(ASSIGNMENT, id=str(uuid.uuid4())),
+        ]
+        with count_queries() as statements:
+            response = client.post(
+                "/wed/assignments/batch", json=batch, headers=headers
+            )
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [201] * 20 + [400, 200, 403, 404]
+        )
+        self.assertEqual(results[5]["assignment"]["name"], "Batch 5")
+        self.assertEqual(results[21]["assignment"]["name"], "Renamed")
+
+        # twenty assignments are created with a single insert statement
+        inserts = [s for s in statements if s.startswith("INSERT INTO assignment ")]
+        self.assertEqual(len(inserts), 1)
+
+        response = client.get(f"/wed/assignments/{existing_id}", headers=headers)
+        self.assertEqual(response.get_json()["name"], "Renamed")
+
+        # items with values of the wrong type are skipped, not the whole batch
+        batch = [
+            dict(ASSIGNMENT, name="Typed 0"),
+            dict(ASSIGNMENT, points="abc"),
+            dict(ASSIGNMENT, points=None),
+            dict(ASSIGNMENT, num_of_attempts=[]),
+            dict(ASSIGNMENT, points=True),
+            dict(ASSIGNMENT, name=["list"]),
+            dict(ASSIGNMENT, name="Typed 1"),
+        ]
+        response = client.post("/wed/assignments/batch", json=batch, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [201] + [400] * 5 + [201]
+        )
+        for result in (results[0], results[-1]):
+            assignment_id = result["assignment"]["id"]
+            response = client.get(f"/wed/assignments/{assignment_id}", headers=headers)
+            self.assertEqual(response.status_code, 200)
+
+        response = client.post(
+            "/wed/assignments/batch", json=ASSIGNMENT, headers=headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_submission_listing(self):
+        print("Running test_submission_listing...")
+
+        client = app.test_client()
+        owner = create_account()
+        headers = basic_auth_header(owner)
+        response = client.post("/wed/assignments", json=ASSIGNMENT, headers=headers)
+        assignment_id = uuid.UUID(response.get_json()["id"])
+
+        # three attempts by one student and one by another, oldest first
+        with app.app_context():
+            students = [
+                Account.query.filter_by(email=create_account()).one().id
+                for _ in range(2)
+            ]
+            for minute, student in enumerate(
+                [students[0], students[1]] + [students[0]] * 2
+            ):
+                db.session.add(
+                    AssignmentSubmission(
+                        assignment_id=assignment_id,
+                        account_id=student,
+                        submission_url=f"https://example.com/{minute}.zip",
+                        submission_date=datetime(2024, 1, 1, 0, minute),
+                    )
+                )
+            db.session.commit()
+
+        url = f"/wed/assignments/{assignment_id}/submissions"
+        urls = []
+        next_cursor = None
+        while True:
+            query = {"limit": 3} | ({"cursor": next_cursor} if next_cursor else {})
+            body = client.get(url, query_string=query, headers=headers).get_json()
+            urls += [submission["submission_url"] for submission in body["submissions"]]
+            next_cursor = body["next"]
+            if not next_cursor:
+                break
+        self.assertEqual(urls, [f"https://example.com/{i}.zip" for i in range(4)])
+
+        body = client.get(f"{url}?latest=true", headers=headers).get_json()
+        latest = {s["account_id"]: s["submission_url"] for s in body["submissions"]}
+        self.assertEqual(
+            latest,
+            {
+                str(students[0]): "https://example.com/3.zip",
+                str(students[1]): "https://example.com/1.zip",
+            },
+        )
+
+        # only the owner can read submissions
+        other = basic_auth_header(create_account())
+        self.assertEqual(client.get(url, headers=other).status_code, 403)
+        self.assertEqual(client.get(f"{url}?page=2", headers=headers).status_code, 400)
+        missing = f"/wed/assignments/{uuid.uuid4()}/submissions"
+        self.assertEqual(client.get(missing, headers=headers).status_code, 404)
+
+    def test_populate_db(self):
+        print("Running test_populate_db...")
+
+        existing = create_account()
+        new_emails = [f"{uuid.uuid4()}@example.com" for _ in range(3)]
+        rows = ["first_name,last_name,email,password"]
+        rows += [f"new,user,{email},secret" for email in new_emails]
+        rows += [f"old,user,{existing},other", f"dup,user,{new_emails[0]},secret"]
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("\n".join(rows) + "\n")
+        try:
+            with app.app_context():
+                with count_queries() as statements:
+                    inserted, skipped = populate_db(f.name, chunk_size=2)
+                self.assertEqual((inserted, skipped), (3, 2))
+                inserts = [
+                    s for s in statements if s.startswith("INSERT INTO account ")
+                ]
+                self.assertEqual(len(inserts), 2)
+
+                accounts = Account.query.filter(Account.email.in_(new_emails)).all()
+                self.assertEqual(len(accounts), 3)
+                self.assertTrue(
+                    bcrypt.check_password_hash(accounts[0].password, "secret")
+                )
+                old = Account.query.filter_by(email=existing).one()
+                self.assertEqual(old.first_name, "test")
+        finally:
+            os.remove(f.name)
+
+    def test_populate_db_command(self):
+        print("Running test_populate_db_command...")
+
+        runner = app.test_cli_runner()
+        # once with the default chunk size, once with one given on the command
+        for args in ([], ["--chunk-size", "2"]):
+            emails = [f"{uuid.uuid4()}@example.com" for _ in range(3)]
+            rows = ["first_name,last_name,email,password"]
+            rows += [f"new,user,{email},secret" for email in emails]
+            with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+                f.write("\n".join(rows) + "\n")
+            os.environ["CSV_PATH"] = f.name
+            try:
+                result = runner.invoke(args=["populate_db", *args])
+                self.assertEqual(result.exit_code, 0, result.output)
+                with app.app_context():
+                    accounts = Account.query.filter(Account.email.in_(emails))
+                    self.assertEqual(accounts.count(), 3)
+            finally:
+                del os.environ["CSV_PATH"]
+                os.remove(f.name)
+
+    def test_populate_db_resumes_from_checkpoint(self):
+        print("Running test_populate_db_resumes_from_checkpoint...")
+
+        emails = [f"{uuid.uuid4()}@example.com" for _ in range(6)]
+        rows = ["first_name,last_name,email,password"]
+        rows += [f'"new","multi\nline",{email},secret' for email in emails]
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("\n".join(rows) + "\n")
+
+        hash_many = bcrypt_pool.hash_many
+        hashed = []
+
+        def failing_hash_many(passwords):
+            # the second chunk dies halfway through the import
+            if hashed:
+                raise RuntimeError("interrupted")
+            hashed.extend(passwords)
+            return hash_many(passwords)
+
+        try:
+            with app.app_context():
+                bcrypt_pool.hash_many = failing_hash_many
+                with self.assertRaises(RuntimeError):
+                    populate_db(f.name, chunk_size=2)
+                db.session.rollback()
+                bcrypt_pool.hash_many = hash_many
+
+                # only the rows after the committed chunk are imported again
+                self.assertEqual(populate_db(f.name, chunk_size=2), (4, 0))
+                accounts = Account.query.filter(Account.email.in_(emails)).all()
+                self.assertEqual(len(accounts), 6)
+                self.assertEqual(accounts[0].last_name, "multi\nline")
+
+                # an unchanged file is skipped
+                with count_queries() as statements:
+                    self.assertEqual(populate_db(f.name, chunk_size=2), (0, 0))
+                self.assertFalse(any("account" in s for s in statements))
+        finally:
+            bcrypt_pool.hash_many = hash_many
+            os.remove(f.name)
+
+    def test_queued_logging(self):
+        print("Running test_queued_logging...")
+
+        marker = str(uuid.uuid4())
+        app.logger.info("Queued log line %s", marker)
+        self.assertTrue(queued_logging.flush(timeout=5))
+
+        # the file keeps the JSON format the CloudWatch agent expects
+        with open(file_handler.baseFilename) as f:
+            lines = [json.loads(line) for line in f if marker in line]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["message"], f"Queued log line {marker}")
+        self.assertEqual(lines[0]["log_level"], "INFO")
+        self.assertIn("date_time", lines[0])
+
+    def test_queued_logging_drops_when_full(self):
+        print("Running test_queued_logging_drops_when_full...")
+
+        release = threading.Event()
+        written = []
+
+        class SlowHandler(logging.Handler):
+            def emit(self, record):
+                release.wait()
+                written.append(record.getMessage())
+
+        class FakeApp:
+            logger = logging.getLogger(f"queued-logging-{uuid.uuid4()}")
+
+        pipeline = QueuedLogging()
+        os.environ["LOG_QUEUE_SIZE"] = "2"
+        try:
+            pipeline.init_app(FakeApp, SlowHandler())
+        finally:
+            del os.environ["LOG_QUEUE_SIZE"]
+        FakeApp.logger.propagate = False
+
+        try:
+            for i in range(10):
+                FakeApp.logger.warning(f"line {i}")
+            # logging never waits for the stuck handler, overflow is dropped
+            self.assertGreaterEqual(pipeline.dropped, 7)
+            release.set()
+            self.assertTrue(pipeline.flush(timeout=5))
+            self.assertEqual(len(written) + pipeline.dropped, 10)
+        finally:
+            release.set()
+            pipeline.stop()
+
+    def test_statsd_metrics_are_batched(self):
+        print("Running test_statsd_metrics_are_batched...")
+
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(5)
+        client = BufferedStatsClient("127.0.0.1", receiver.getsockname()[1])
+        client.batch_size = 3
+        try:
+            client.incr("csye6225_test_a")
+            client.incr("csye6225_test_b", tags={"method": "get"})
+            client.timing("csye6225_test_c", 5)
+            # three metrics fill the batch and go out as a single packet
+            packet = receiver.recv(2048).decode("ascii")
+            self.assertEqual(
+                packet.split("\n"),
+                [
+                    "csye6225_test_a:1|c",
+                    "csye6225_test_b:1|c|#method:get",
+                    "csye6225_test_c:5.000000|ms",
+                ],
+            )
+        finally:
+            receiver.close()
+            client.close()
+
+    def test_request_metrics(self):
+        print("Running test_request_metrics...")
+
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(5)
+        statsd.flush()
+        address = statsd._addr
+        statsd._addr = receiver.getsockname()
+        try:
+            response = app.test_client().get("/healthz")
+            statsd.flush()
+            lines = receiver.recv(8192).decode("ascii").split("\n")
+        finally:
+            statsd._addr = address
+            receiver.close()
+
+        tags = (
+            f"|#endpoint:database_health_check,method:get,status:{response.status_code}"
+        )
+        self.assertTrue(
+            any(
+                line.startswith("csye6225_request_duration:")
+                and line.endswith("|ms" + tags)
+                for line in lines
+            )
+        )
+        self.assertIn("csye6225_request:1|c" + tags, lines)
+        self.assertIn("csye6225_response_size:0|g" + tags, lines)
+
+    def test_query_metrics_logged_per_request(self):
+        print("Running test_query_metrics_logged_per_request...")
+
+        email = create_account()
+        path = f"/wed/assignments/{uuid.uuid4()}"
+        slow_query_ms = request_metrics.slow_query_ms
+        request_metrics.slow_query_ms = 0
+        try:
+            response = app.test_client().get(path, headers=basic_auth_header(email))
+        finally:
+            request_metrics.slow_query_ms = slow_query_ms
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(queued_logging.flush(timeout=5))
+
+        with open(file_handler.baseFilename) as f:
+            lines = [json.loads(line) for line in f]
+        summary = [line for line in lines if line["message"].startswith(f"GET {path}")]
+        self.assertEqual(len(summary), 1)
+        self.assertEqual(summary[0]["endpoint"], "get_assignment_detail")
+        self.assertEqual(summary[0]["status"], 404)
+        self.assertGreaterEqual(summary[0]["query_count"], 1)
+        self.assertIn("db_time_ms", summary[0])
+
+        # every statement counts as slow here, none may leak parameter values
+        slow = [line["message"] for line in lines if "Slow query" in line["message"]]
+        self.assertTrue(any("<redacted>" in message for message in slow))
+        self.assertFalse(any(email in message for message in slow))
+
+    def test_request_profiling(self):
+        print("Running test_request_profiling...")
+
+        client = app.test_client()
+        with tempfile.TemporaryDirectory() as directory:
+            settings = (request_profiler.token, request_profiler.directory)
+            request_profiler.token = "profile-secret"
+            request_profiler.directory = directory
+            request_profiler.keep = 2
+            try:
+                # requests without the right token are not profiled
+                for token in ("no", "sécret"):
+                    response = client.get(
+                        "/healthz", headers={"X-Profile-Token": token}
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertNotIn("X-Profile-Id", response.headers)
+                self.assertEqual(request_profiler.profiles(), [])
+
+                names = []
+                for _ in range(3):
+                    response = client.get(
+                        "/healthz", headers={"X-Profile-Token": "profile-secret"}
+                    )
+                    names.append(response.headers["X-Profile-Id"])
+
+                # only the newest profiles are kept
+                profiles = request_profiler.profiles()
+                self.assertEqual([os.path.basename(p) for p in profiles], names[1:])
+                self.assertIn("database_health_check", summarize(profiles))
+            finally:
+                request_profiler.token, request_profiler.directory = settings
+                request_profiler.keep = 50
+
+    def test_traffic_capture_and_replay(self):
+        print("Running test_traffic_capture_and_replay...")
+
+        with tempfile.TemporaryDirectory() as directory:
+            capture = os.path.join(directory, "capture.jsonl")
+            capture_app = Flask("capture")
+
+            @capture_app.route("/echo", methods=["POST"])
+            def echo():
+                return {"ok": True}, 201
+
+            recorder = TrafficRecorder()
+            os.environ["TRAFFIC_CAPTURE_FILE"] = capture
+            try:
+                recorder.init_app(capture_app)
+            finally:
+                del os.environ["TRAFFIC_CAPTURE_FILE"]
+            client = capture_app.test_client()
+            client.post(
+                "/echo?x=1",
+                json={"name": "a", "password": "hunter2", "items": [{"token": "t"}]},
+                headers=basic_auth_header("someone@example.com", "hunter2"),
+            )
+            self.assertTrue(recorder.pipeline.flush(timeout=5))
+            recorder.pipeline.stop()
+
+            # credentials never reach the capture
+            with open(capture) as f:
+                raw = f.read()
+            self.assertNotIn("hunter2", raw)
+            self.assertNotIn("someone@example.com", raw)
+            [entry] = read_capture(capture)
+            self.assertEqual(entry["method"], "POST")
+            self.assertEqual(entry["path"], "/echo")
+            self.assertEqual(entry["query"], "x=1")
+            self.assertEqual(entry["auth"], "basic")
+            self.assertEqual(entry["status"], 201)
+            self.assertEqual(
+                entry["body"],
+                {
+                    "name": "a",
+                    "password": "<redacted>",
+                    "items": [{"token": "<redacted>"}],
+                },
+            )
+
+        # replay a capture against the app with a replay account
+        email = create_account()
+        entries = [
+            {
+                "timestamp": 1000 + i * 0.01,
+                "method": "GET",
+                "path": path,
+                "query": "",
+                "endpoint": endpoint,
+                "auth": auth,
+                "body": None,
+                "status": 200,
+                "duration_ms": 5.0,
+            }
+            for i, (path, endpoint, auth) in enumerate(
+                [
+                    ("/healthz", "database_health_check", None),
+                    ("/wed/assignments", "get_assignments", "basic"),
+                ]
+                * 3
+            )
+        ]
+        report = replay(
+            entries, make_sender(app, email=email, password="secret"), speed=2
+        )
+        self.assertEqual(report["requests"], 6)
+        self.assertEqual(report["overall"]["status_mismatches"], 0)
+        self.assertEqual(report["endpoints"]["get_assignments"]["replayed"]["count"], 3)
+        self.assertEqual(report["overall"]["recorded"]["p50_ms"], 5.0)
+
+    def test_foreign_key_lookups_use_indexes(self):
+        print("Running test_foreign_key_lookups_use_indexes...")
+
+        account_id = uuid.uuid4()
+        assignment_id = uuid.uuid4()
+        # each of these has its own index, which beats scanning a composite one
+        dedicated = {
+            "ix_assignment_submission_account_id": select(
+                AssignmentSubmission.id
+            ).where(AssignmentSubmission.account_id == account_id),
+            "ix_assignment_account_id": select(Assignment.id).where(
+                Assignment.account_id == account_id
+            ),
+        }
+        for index, statement in dedicated.items():
+            self.assertIn(index, explain(statement))
+
+        # several indexes lead with assignment_id and the planner may pick any
+        statements = [
+            select(AssignmentSubmission.id).where(
+                AssignmentSubmission.assignment_id == assignment_id,
+                AssignmentSubmission.account_id == account_id,
+            ),
+            delete(AssignmentSubmission).where(
+                AssignmentSubmission.assignment_id == assignment_id
+            ),
+            select(AssignmentSubmission.id)
+            .where(AssignmentSubmission.assignment_id == assignment_id)
+            .order_by(AssignmentSubmission.submission_date, AssignmentSubmission.id)
+            .limit(51),
+        ]
+        # with sequential scans disabled, one only shows up if no index fits
+        for statement in statements:
+            plan = explain(statement)
+            self.assertIn("Index", plan)
+            self.assertNotIn("Seq Scan", plan)
+
 
 if __name__ == "__main__":
     unittest.main()
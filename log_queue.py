@@ -0,0 +1,143 @@
+import atexit
+import copy
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from per_process import PerProcess
+
+
+class BatchingFileHandler(logging.FileHandler):
+    """FileHandler that writes records in batches.
+
+    Formatted lines are buffered and written with a single write() once
+    the buffer is full or flush() is called, e.g. when the log queue
+    runs dry. The file content is the same as with a plain FileHandler.
+    """
+
+    def __init__(self, filename, capacity=100, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.capacity = capacity
+        self.buffer = []
+
+    def emit(self, record):
+        try:
+            self.buffer.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self.buffer) >= self.capacity:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.buffer:
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write("".join(self.buffer))
+                self.buffer = []
+            super().flush()
+        finally:
+            self.release()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that hands records to a QueuedLogging pipeline."""
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def prepare(self, record):
+        # only resolve the message here, the listener does the formatting
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        self.pipeline.put(record)
+
+
+class BatchingQueueListener(QueueListener):
+    def dequeue(self, block):
+        # write out buffered lines before waiting for more records
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class QueuedLogging(PerProcess):
+    """Moves log formatting and file writes off the logging thread.
+
+    Records go onto a bounded queue and a listener thread formats them
+    and passes them to the real handlers. When the queue is full records
+    are dropped, or with the block policy the caller waits up to the queue
+    timeout before the record is dropped.
+    """
+
+    def __init__(self, statsd=None):
+        self.statsd = statsd
+        self.handlers = []
+        self.block = False
+        self.timeout = 1.0
+        self.dropped = 0
+        self.queue = queue.Queue(maxsize=10000)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, *handlers, logger=None):
+        self.queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", 10000)))
+        self.block = os.getenv("LOG_QUEUE_POLICY", "drop").lower() == "block"
+        self.timeout = float(os.getenv("LOG_QUEUE_TIMEOUT", self.timeout))
+        self.handlers = list(handlers)
+        (logger or app.logger).addHandler(BoundedQueueHandler(self))
+
+    def _start_process(self):
+        self._listener = BatchingQueueListener(
+            self.queue, *self.handlers, respect_handler_level=True
+        )
+        self._listener.start()
+        atexit.register(self.stop)
+
+    def put(self, record):
+        with self._lock:
+            self._ensure_process()
+        try:
+            if self.block:
+                self.queue.put(record, timeout=self.timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            if self.statsd:
+                self.statsd.incr("csye6225_log_dropped")
+
+    def flush(self, timeout=None):
+        """Wait until every queued record has been written."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        for handler in self.handlers:
+            handler.flush()
+        return True
+
+    def stop(self):
+        with self._lock:
+            if self._listener is None or not self._owns_process():
+                return
+            listener, self._listener, self._pid = self._listener, None, None
+        listener.stop()
+        for handler in self.handlers:
+            handler.flush()
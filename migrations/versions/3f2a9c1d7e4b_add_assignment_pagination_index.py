@@ -0,0 +1,26 @@
+"""add Assignment pagination index
+
+Revision ID: 3f2a9c1d7e4b
+Revises: 2516855d447b
+Create Date: 2026-10-18 20:45:12.318204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e4b'
+down_revision = '2516855d447b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY does not block writes, but cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_assignment_created_id', 'assignment', ['assignment_created', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_assignment_created_id', table_name='assignment', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,34 @@
+"""add foreign key indexes
+
+Revision ID: 9c4e1b7a2d63
+Revises: e36933da151c
+Create Date: 2026-10-18 21:02:41.118520
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e1b7a2d63'
+down_revision = 'e36933da151c'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_assignment_account_id', 'assignment', ['account_id']),
+    ('ix_assignment_submission_assignment_account', 'assignment_submission', ['assignment_id', 'account_id']),
+    ('ix_assignment_submission_account_id', 'assignment_submission', ['account_id']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY does not block writes, but cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,26 @@
+"""add Submission pagination index
+
+Revision ID: b1d83f4c6a90
+Revises: 9c4e1b7a2d63
+Create Date: 2026-10-18 21:24:09.530172
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1d83f4c6a90'
+down_revision = '9c4e1b7a2d63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY does not block writes, but cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_assignment_submission_assignment_date', 'assignment_submission', ['assignment_id', 'submission_date', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_assignment_submission_assignment_date', table_name='assignment_submission', postgresql_concurrently=True, if_exists=True)
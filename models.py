@@ -2,7 +2,9 @@ import uuid
 from datetime import datetime
 
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import UUID, CheckConstraint
+from sqlalchemy import UUID, CheckConstraint, event
+
+from extensions import credential_cache
 
 db = SQLAlchemy()
 
@@ -22,6 +24,13 @@ class Account(db.Model):
     assignments = db.relationship("Assignment", backref="account", lazy=True)
 
 
+# drop cached credentials whenever an account's password changes
+@event.listens_for(Account.password, "set")
+def invalidate_cached_credentials(target, value, oldvalue, initiator):
+    if target.email and value != oldvalue:
+        credential_cache.invalidate(target.email)
+
+
 class Assignment(db.Model):
     id = db.Column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True
@@ -43,6 +52,9 @@ class Assignment(db.Model):
         CheckConstraint(
             "num_of_attempts>=1 AND num_of_attempts<=10", name="check_num_of_attempts"
         ),
+        # supports keyset pagination of the assignment listing
+        db.Index("ix_assignment_created_id", "assignment_created", "id"),
+        db.Index("ix_assignment_account_id", "account_id"),
     )
 
     def to_dict(self):
@@ -73,6 +85,21 @@ class AssignmentSubmission(db.Model):
         db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
     )
 
+    __table_args__ = (
+        # per-user submission lookups and deletes by assignment
+        db.Index(
+            "ix_assignment_submission_assignment_account", "assignment_id", "account_id"
+        ),
+        db.Index("ix_assignment_submission_account_id", "account_id"),
+        # supports keyset pagination of an assignment's submissions
+        db.Index(
+            "ix_assignment_submission_assignment_date",
+            "assignment_id",
+            "submission_date",
+            "id",
+        ),
+    )
+
     account = db.relationship("Account", backref="submissions")
     assignment = db.relationship("Assignment", backref="submissions")
 
@@ -80,12 +107,47 @@ class AssignmentSubmission(db.Model):
         return {
             "id": str(self.id),
             "assignment_id": str(self.assignment_id),
+            "account_id": str(self.account_id),
             "submission_url": self.submission_url,
             "submission_date": self.submission_date.isoformat(),
             "submission_updated": self.submission_updated.isoformat(),
         }
 
 
+# Attempts used per (assignment, account), updated atomically on submission
+class SubmissionAttempt(db.Model):
+    assignment_id = db.Column(
+        UUID(as_uuid=True), db.ForeignKey("assignment.id"), primary_key=True
+    )
+    account_id = db.Column(
+        UUID(as_uuid=True), db.ForeignKey("account.id"), primary_key=True
+    )
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Notifications waiting to be published, written in the same transaction as
+# the submission so none are lost if the process dies before publishing
+class SubmissionOutbox(db.Model):
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    topic_arn = db.Column(db.String(255))
+    payload = db.Column(db.Text, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, index=True
+    )
+
+
+# Progress of a CSV import, committed together with each imported chunk
+class ImportCheckpoint(db.Model):
+    path = db.Column(db.String(255), primary_key=True)
+    file_hash = db.Column(db.String(64), nullable=False)
+    byte_offset = db.Column(db.BigInteger, nullable=False, default=0)
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
 # To have original submission timstamp and modified updated tiemstamp
 
 # class AssignmentSubmission(db.Model):
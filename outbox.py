@@ -0,0 +1,74 @@
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from extensions import sns_publisher
+from models import SubmissionOutbox, db
+
+
+def add_to_outbox(topic_arn, message):
+    """Stage a notification in the current transaction."""
+    # id assigned up front so it can be read without a refresh after commit
+    entry = SubmissionOutbox(
+        id=uuid.uuid4(), topic_arn=topic_arn, payload=json.dumps(message)
+    )
+    db.session.add(entry)
+    return entry
+
+
+def delete_delivered(app, ids):
+    # called from the publisher thread once messages reached SNS
+    with app.app_context():
+        SubmissionOutbox.query.filter(SubmissionOutbox.id.in_(ids)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+
+def drain_outbox(app, batch_size=100, grace_seconds=None):
+    """Publish outbox rows left behind by the in-process publisher.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    drain processes can run side by side without publishing the same row
+    twice. Only rows older than the grace period are claimed to leave
+    time for the in-process publisher to deliver fresh ones. Delivery is
+    at least once. Returns the number of published rows.
+    """
+    if grace_seconds is None:
+        grace_seconds = int(os.getenv("OUTBOX_GRACE_SECONDS", 60))
+    published = 0
+    while True:
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        rows = (
+            SubmissionOutbox.query.filter(SubmissionOutbox.created < cutoff)
+            .order_by(SubmissionOutbox.created)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not rows:
+            db.session.commit()
+            return published
+
+        batch_published = 0
+        by_topic = {}
+        for row in rows:
+            by_topic.setdefault(row.topic_arn, []).append(row)
+        for topic_arn, topic_rows in by_topic.items():
+            pending = sns_publisher.send(
+                topic_arn, [json.loads(row.payload) for row in topic_rows]
+            )
+            for i, row in enumerate(topic_rows):
+                if i in pending:
+                    row.attempts += 1
+                else:
+                    db.session.delete(row)
+                    batch_published += 1
+        # releases the row locks for the next batch
+        db.session.commit()
+        published += batch_published
+        app.logger.info(f"Drained {published} outbox notifications so far.")
+        # stop on a short batch, or when SNS is failing so rows are not retried hot
+        if len(rows) < batch_size or not batch_published:
+            return published
@@ -0,0 +1,36 @@
+import base64
+import os
+from datetime import datetime
+from uuid import UUID
+
+# query params understood by paginated listings
+PAGE_ARGS = {"limit", "cursor"}
+
+
+def is_paginated(args):
+    return bool(PAGE_ARGS.intersection(args))
+
+
+def page_size(args):
+    """Return the requested page size clamped to the configured cap."""
+    default = int(os.getenv("PAGE_SIZE_DEFAULT", 50))
+    cap = int(os.getenv("PAGE_SIZE_MAX", 100))
+    limit = int(args.get("limit", default))
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, cap)
+
+
+# cursors are opaque to clients: the sort key of the last row on the page
+def encode_cursor(timestamp, row_id):
+    raw = f"{timestamp.isoformat()}|{row_id}".encode("UTF-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("UTF-8")
+        timestamp, row_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), UUID(row_id)
+    except (UnicodeError, ValueError) as e:
+        raise ValueError("invalid cursor") from e
@@ -0,0 +1,23 @@
+import os
+
+
+class PerProcess:
+    """Mixin for objects that own threads or executors.
+
+    Threads do not survive a fork, so _start_process() runs lazily on first
+    use in each process, e.g. once in every gunicorn worker. Callers hold
+    the object's lock around _ensure_process().
+    """
+
+    _pid = None
+
+    def _start_process(self):
+        raise NotImplementedError
+
+    def _ensure_process(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._start_process()
+
+    def _owns_process(self):
+        return self._pid == os.getpid()
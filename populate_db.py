@@ -1,42 +1,150 @@
 import csv
+import hashlib
+import os
+import time
 
-from models import Account, db
-
-# generate hashed password using Bcrypt
-def hash_password(password, bcrypt_instance):
-    hashed_pw = bcrypt_instance.generate_password_hash(password).decode("UTF-8")
-    return hashed_pw
-
-
-def populate_db(filepath, bcrypt_instance):
-    try:
-        with open(filepath, "r") as f:
-            reader = csv.reader(f)
-            next(reader)  # skip the header row
-            for row in reader:
-                hashed_password = hash_password(row[3], bcrypt_instance)
-                # skip if the user exists (no updates)
-                existing_user = Account.query.filter_by(email=row[2]).first()
-                if existing_user:
-                    print(f"Skipping as User with email {row[2]} already exists.")
-                    continue
-                else:
-                    user = Account(
-                        first_name=row[0],
-                        last_name=row[1],
-                        email=row[2],
-                        password=hashed_password,
-                    )
-                    # add the account and commit
-                    try:
-                        db.session.add(user)
-                        db.session.commit()
-                    except Exception as e:
-                        print(f"Error occurred while adding users to DB: \n{e}\n")
-                        db.session.rollback()
-    except FileNotFoundError:
-        print(f"File {filepath} not found!")
-    except csv.Error as csv_error:
-        print(f"Error occurred while processing CSV: \n{csv_error}\n")
-    except Exception as e:
-        print(f"An unexpected error occurred: \n{e}\n")
+from flask import current_app as app
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from extensions import bcrypt_pool
+from models import Account, ImportCheckpoint, db
+
+# seconds between progress log lines during an import
+PROGRESS_INTERVAL = 10
+
+
+def file_hash(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_rows(f, position):
+    """Yield (row, offset after the row) from a binary file.
+
+    csv.reader pulls exactly the lines each row needs, quoted newlines
+    included, so the offset always lands on a row boundary.
+    """
+
+    def lines():
+        for line in f:
+            position[0] += len(line)
+            yield line.decode("UTF-8")
+
+    for row in csv.reader(lines()):
+        yield row, position[0]
+
+
+def insert_accounts(rows):
+    """Hash and insert one chunk of new users, returns how many were added.
+
+    Only emails not already in the database are hashed. The caller commits.
+    """
+    emails = {row[2] for row in rows}
+    existing = set(
+        db.session.scalars(select(Account.email).where(Account.email.in_(emails)))
+    )
+    new_rows = {}
+    for row in rows:
+        if row[2] not in existing:
+            new_rows.setdefault(row[2], row)
+    if not new_rows:
+        return 0
+
+    # the pool hashes the whole chunk in parallel across its workers
+    rows = list(new_rows.values())
+    hashes = bcrypt_pool.hash_many([row[3] for row in rows])
+    accounts = [
+        {
+            "first_name": row[0],
+            "last_name": row[1],
+            "email": row[2],
+            "password": hashed_pw,
+        }
+        for row, hashed_pw in zip(rows, hashes)
+    ]
+    # users created by someone else meanwhile are left untouched
+    statement = (
+        insert(Account)
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(Account.id)
+    )
+    return len(db.session.scalars(statement, accounts).all())
+
+
+def populate_db(filepath, chunk_size=1000):
+    """Stream users from a CSV file into the database in chunks.
+
+    Each chunk is committed together with a checkpoint holding the file
+    hash and the byte offset reached, so an interrupted import resumes
+    where it stopped and an unchanged file is skipped. Memory use does not
+    grow with the file. Returns (inserted, skipped).
+    """
+    started = time.monotonic()
+    path = os.path.abspath(filepath)
+    digest = file_hash(path)
+    checkpoint = db.session.get(ImportCheckpoint, path)
+    if checkpoint is None or checkpoint.file_hash != digest:
+        # a new or changed file is imported from the start
+        checkpoint = db.session.merge(
+            ImportCheckpoint(path=path, file_hash=digest, byte_offset=0, rows=0)
+        )
+    elif checkpoint.byte_offset >= os.path.getsize(path):
+        app.logger.info(f"Skipping import of {path}, already imported.")
+        return 0, 0
+    else:
+        app.logger.info(
+            f"Resuming import of {path} after {checkpoint.rows} rows "
+            f"at byte {checkpoint.byte_offset}."
+        )
+
+    inserted = skipped = 0
+    last_report = started
+
+    def commit_chunk(chunk, offset):
+        nonlocal inserted, skipped, last_report
+        added = insert_accounts(chunk)
+        inserted += added
+        skipped += len(chunk) - added
+        checkpoint.byte_offset = offset
+        checkpoint.rows += len(chunk)
+        db.session.commit()
+
+        if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            rate = (inserted + skipped) / (last_report - started)
+            app.logger.info(
+                f"Import of {path} at {checkpoint.rows} rows, {rate:.0f} rows/sec"
+            )
+
+    with open(path, "rb") as f:
+        position = [checkpoint.byte_offset]
+        f.seek(position[0])
+        rows = read_rows(f, position)
+        if position[0] == 0:
+            next(rows, None)  # skip the header row
+
+        chunk = []
+        for row, offset in rows:
+            if not row:
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                commit_chunk(chunk, offset)
+                chunk = []
+        if chunk:
+            commit_chunk(chunk, offset)
+
+    # trailing blank lines still mark the file as done
+    checkpoint.byte_offset = position[0]
+    db.session.commit()
+    elapsed = time.monotonic() - started
+    rate = (inserted + skipped) / elapsed if elapsed else 0
+    app.logger.info(
+        f"Imported {inserted} users from {path}, skipped {skipped} existing, "
+        f"in {elapsed:.1f}s ({rate:.0f} rows/sec)"
+    )
+    return inserted, skipped
@@ -0,0 +1,93 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import time
+
+from flask import g, request
+
+# header that asks for a profile of the request, checked against PROFILE_TOKEN
+PROFILE_HEADER = "X-Profile-Token"
+
+
+class RequestProfiler:
+    """Profiles selected requests with cProfile.
+
+    A request is profiled when it carries PROFILE_TOKEN in the
+    X-Profile-Token header, or at random with PROFILE_SAMPLE_RATE. Each
+    profile is written as a pstats file to PROFILE_DIR, which keeps only
+    the newest PROFILE_KEEP files.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.token = None
+        self.sample_rate = 0.0
+        self.directory = "/tmp/webapp-profiles"
+        self.keep = 50
+
+    def init_app(self, app):
+        self.app = app
+        self.token = os.getenv("PROFILE_TOKEN")
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", self.sample_rate))
+        self.directory = os.getenv("PROFILE_DIR", self.directory)
+        self.keep = int(os.getenv("PROFILE_KEEP", self.keep))
+        app.before_request(self.start)
+        app.after_request(self.stop)
+
+    def wanted(self):
+        token = request.headers.get(PROFILE_HEADER)
+        if token and self.token:
+            return hmac.compare_digest(
+                token.encode("UTF-8"), self.token.encode("UTF-8")
+            )
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        if not self.wanted():
+            return
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    def stop(self, response):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        try:
+            endpoint = (request.endpoint or "unknown").split(".")[-1]
+            name = f"{time.time_ns()}-{endpoint}-{request.method.lower()}.prof"
+            os.makedirs(self.directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.directory, name))
+            self.trim()
+            response.headers["X-Profile-Id"] = name
+        except OSError as e:
+            self.app.logger.error(f"Unable to save request profile: {e}")
+        return response
+
+    def profiles(self):
+        # names start with a timestamp, so they sort oldest first
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".prof")
+        )
+
+    def trim(self):
+        for path in self.profiles()[: -self.keep or None]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # removed by another worker
+
+
+def summarize(paths, limit=20, sort="cumulative"):
+    """Merge pstats files and return the report for the top functions."""
+    out = io.StringIO()
+    stats = pstats.Stats(*paths, stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
@@ -84,6 +84,7 @@ sudo useradd -s /bin/false -g csye6225 -d /opt/csye6225 -m csye6225
 sudo unzip /tmp/webapp.zip -d /opt/webapp/
 sudo mv /opt/webapp/users.csv /opt/users.csv
 sudo mv /tmp/csye6225.service /etc/systemd/system/csye6225.service
+sudo mv /opt/webapp/csye6225-outbox.service /etc/systemd/system/csye6225-outbox.service
 
 ls -l /tmp/
 ls -la /opt/
@@ -95,3 +96,4 @@ pip install --upgrade pip
 pip install -r /opt/webapp/requirements.txt
 
 sudo systemctl enable csye6225
+sudo systemctl enable csye6225-outbox
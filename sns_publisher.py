@@ -0,0 +1,195 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+import boto3
+
+from per_process import PerProcess
+
+# SNS accepts at most 10 entries per publish_batch call
+MAX_BATCH_SIZE = 10
+
+
+class SnsPublisher(PerProcess):
+    """Publishes SNS messages from a background thread.
+
+    Messages are put on a bounded in-memory queue and sent in micro-batches
+    with publish_batch through one long-lived client. Failed entries are
+    retried with exponential backoff, so a request only pays for the
+    enqueue. Set SNS_ENDPOINT_URL to point the client at a local stand-in.
+    Messages may carry a key, which is handed to on_delivered once the
+    message is no longer pending, e.g. to clear its outbox row.
+    """
+
+    def __init__(self, statsd=None):
+        self.statsd = statsd
+        self.app = None
+        self.on_delivered = None
+        self.client = None
+        self.region = None
+        self.endpoint_url = None
+        self.batch_size = MAX_BATCH_SIZE
+        self.linger = 0.05
+        self.max_retries = 5
+        self.backoff = 0.2
+        self._queue = queue.Queue(maxsize=1000)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, on_delivered=None):
+        self.app = app
+        self.on_delivered = on_delivered
+        self.region = os.getenv("AWS_REGION")
+        self.endpoint_url = os.getenv("SNS_ENDPOINT_URL")
+        self.batch_size = min(
+            int(os.getenv("SNS_BATCH_SIZE", self.batch_size)), MAX_BATCH_SIZE
+        )
+        self.linger = int(os.getenv("SNS_BATCH_LINGER_MS", 50)) / 1000
+        self.max_retries = int(os.getenv("SNS_MAX_RETRIES", self.max_retries))
+        self.backoff = float(os.getenv("SNS_RETRY_BACKOFF", self.backoff))
+        self._queue = queue.Queue(maxsize=int(os.getenv("SNS_QUEUE_SIZE", 1000)))
+
+    def get_client(self):
+        if self.client is None:
+            self.client = boto3.client(
+                "sns", region_name=self.region, endpoint_url=self.endpoint_url
+            )
+        return self.client
+
+    def _start_process(self):
+        self._thread = threading.Thread(
+            target=self._run, name="sns-publisher", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.flush, 5)
+
+    def publish(self, topic_arn, message, key=None):
+        """Queue a message for publishing, returns False if it was dropped."""
+        with self._lock:
+            self._ensure_process()
+        try:
+            self._queue.put_nowait((topic_arn, message, key))
+        except queue.Full:
+            self.app.logger.error(
+                f"SNS publish queue is full, dropping message for topic {topic_arn}"
+            )
+            if self.statsd:
+                self.statsd.incr("csye6225_sns_dropped")
+            return False
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been handled."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                topics = {}
+                for topic_arn, message, key in batch:
+                    topics.setdefault(topic_arn, []).append((message, key))
+                delivered = []
+                for topic_arn, items in topics.items():
+                    pending = self.send(topic_arn, [message for message, _ in items])
+                    delivered.extend(
+                        key
+                        for i, (_, key) in enumerate(items)
+                        if key is not None and i not in pending
+                    )
+                if delivered and self.on_delivered:
+                    self.on_delivered(delivered)
+            except Exception as e:
+                self.app.logger.error(f"Unexpected error in SNS publisher: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def send(self, topic_arn, messages):
+        """Publish messages with retries.
+
+        Messages are sent in publish_batch calls of at most MAX_BATCH_SIZE
+        entries. Returns the indexes of messages that are still undelivered
+        after all retries. Messages SNS rejects as invalid are logged and
+        dropped.
+        """
+        pending = {str(i): message for i, message in enumerate(messages)}
+        published = 0
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # exponential backoff with jitter between attempts
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(1, 2))
+            entries = [
+                {"Id": entry_id, "Message": json.dumps(message)}
+                for entry_id, message in pending.items()
+            ]
+            for start in range(0, len(entries), MAX_BATCH_SIZE):
+                chunk = entries[start : start + MAX_BATCH_SIZE]
+                try:
+                    response = self.get_client().publish_batch(
+                        TopicArn=topic_arn, PublishBatchRequestEntries=chunk
+                    )
+                except Exception as e:
+                    self.app.logger.warning(
+                        f"Error publishing to SNS topic {topic_arn} (attempt {attempt + 1}): {e}"
+                    )
+                    continue
+
+                for entry in response.get("Successful", []):
+                    message = pending.pop(entry["Id"])
+                    published += 1
+                    self.app.logger.info(
+                        f"Successfully published to SNS topic {topic_arn} with message: {message}"
+                    )
+                for entry in response.get("Failed", []):
+                    if entry.get("SenderFault"):
+                        # the request itself is invalid, retrying will not help
+                        message = pending.pop(entry["Id"])
+                        self.app.logger.error(
+                            f"SNS rejected message {message}: {entry.get('Message')}"
+                        )
+            if not pending:
+                break
+
+        for message in pending.values():
+            self.app.logger.error(
+                f"Giving up publishing to SNS topic {topic_arn} with message: {message}"
+            )
+        if self.statsd:
+            self.statsd.incr("csye6225_sns_published", published)
+        return {int(entry_id) for entry_id in pending}
+
+
+class StubSns:
+    """SNS client stand-in that accepts every message without sending it.
+
+    Used by the benchmark and traffic replay, so no notifications leave
+    the machine.
+    """
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        return {
+            "Successful": [{"Id": entry["Id"]} for entry in PublishBatchRequestEntries]
+        }
@@ -0,0 +1,214 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import g, request
+
+from log_queue import BatchingFileHandler, QueuedLogging
+
+# body fields that are never written to a capture
+SENSITIVE_FIELDS = {"password", "token", "secret", "authorization"}
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {
+            key: "<redacted>" if key.lower() in SENSITIVE_FIELDS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+class TrafficRecorder:
+    """Appends a sanitized record of every request to a JSONL capture file.
+
+    Disabled unless TRAFFIC_CAPTURE_FILE is set. Records hold the method,
+    path, query string, JSON body, status and duration. Credentials are
+    never written: only the auth scheme is kept and sensitive body fields
+    are redacted. Lines are written from a background queue like the app
+    log, so requests do not wait on the file.
+    """
+
+    def __init__(self, statsd=None):
+        self.path = None
+        self.max_body = 65536
+        self.logger = logging.getLogger("csye6225.traffic")
+        self.pipeline = QueuedLogging(statsd)
+
+    def init_app(self, app):
+        self.path = os.getenv("TRAFFIC_CAPTURE_FILE")
+        if not self.path:
+            return
+        self.max_body = int(os.getenv("TRAFFIC_CAPTURE_MAX_BODY", self.max_body))
+        handler = BatchingFileHandler(self.path)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.pipeline.init_app(app, handler, logger=self.logger)
+        app.before_request(self.start)
+        app.after_request(self.record)
+
+    def start(self):
+        g.capture_time = time.time()
+        g.capture_started = time.perf_counter()
+
+    def record(self, response):
+        started = g.pop("capture_started", None)
+        if started is None:
+            return response
+        body = None
+        if request.content_length and request.content_length <= self.max_body:
+            body = redact(request.get_json(silent=True))
+        authorization = request.headers.get("Authorization")
+        entry = {
+            "timestamp": g.pop("capture_time"),
+            "method": request.method,
+            "path": request.path,
+            "query": request.query_string.decode("UTF-8", "replace"),
+            "endpoint": (request.endpoint or "unknown").split(".")[-1],
+            "auth": authorization.split(" ", 1)[0].lower() if authorization else None,
+            "body": body,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        self.logger.info(json.dumps(entry, default=str))
+        return response
+
+
+def read_capture(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentiles(durations):
+    # nearest rank percentiles in milliseconds
+    ordered = sorted(durations)
+    if not ordered:
+        return {}
+    summary = {"count": len(ordered)}
+    for p in (50, 95, 99):
+        rank = min(len(ordered), max(1, round(p / 100 * len(ordered))))
+        summary[f"p{p}_ms"] = round(ordered[rank - 1], 3)
+    return summary
+
+
+def make_sender(app, url=None, email=None, password=None):
+    """Build send(entry) -> status for the app in-process or a running server.
+
+    Captures hold no credentials, so authenticated requests are replayed
+    with a bearer token issued for the given account.
+    """
+    local = threading.local()
+    headers = {}
+    if email and password:
+        credentials = base64.b64encode(f"{email}:{password}".encode()).decode()
+        basic = {"Authorization": f"Basic {credentials}"}
+        if url:
+            token_request = urllib.request.Request(
+                f"{url}/wed/token", method="POST", headers=basic
+            )
+            with urllib.request.urlopen(token_request) as response:
+                token = json.load(response)["token"]
+        else:
+            token = (
+                app.test_client().post("/wed/token", headers=basic).get_json()["token"]
+            )
+        headers = {"Authorization": f"Bearer {token}"}
+
+    def request_for(entry):
+        target = entry["path"] + (f"?{entry['query']}" if entry["query"] else "")
+        auth = headers if entry["auth"] else {}
+        return target, auth
+
+    def send_local(entry):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        target, auth = request_for(entry)
+        response = local.client.open(
+            target, method=entry["method"], headers=auth, json=entry["body"]
+        )
+        response.get_data()
+        return response.status_code
+
+    def send_remote(entry):
+        target, auth = request_for(entry)
+        data = None
+        if entry["body"] is not None:
+            data = json.dumps(entry["body"]).encode("UTF-8")
+            auth = {**auth, "Content-Type": "application/json"}
+        http_request = urllib.request.Request(
+            url + target, data=data, method=entry["method"], headers=auth
+        )
+        try:
+            with urllib.request.urlopen(http_request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    return send_remote if url else send_local
+
+
+def replay(entries, send, speed=1.0, concurrency=8):
+    """Replay captured requests through send(entry) -> status.
+
+    Requests are started at their original spacing divided by speed, or
+    back to back when speed is 0. Returns the recorded and replayed
+    latency percentiles, overall and per endpoint.
+    """
+    if not entries:
+        return {}
+    # records are appended as requests finish, replay them in arrival order
+    entries = sorted(entries, key=lambda entry: entry["timestamp"])
+    first = entries[0]["timestamp"]
+    started = time.monotonic()
+    lock = threading.Lock()
+    results = []
+
+    def run(entry):
+        begin = time.perf_counter()
+        try:
+            status = send(entry)
+        except Exception:
+            status = None
+        elapsed = (time.perf_counter() - begin) * 1000
+        with lock:
+            results.append((entry, status, elapsed))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for entry in entries:
+            if speed:
+                # keep the captured arrival pattern, scaled by speed
+                delay = (entry["timestamp"] - first) / speed
+                wait = started + delay - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            pool.submit(run, entry)
+    wall = time.monotonic() - started
+
+    def compare(rows):
+        return {
+            "recorded": percentiles([entry["duration_ms"] for entry, _, _ in rows]),
+            "replayed": percentiles([elapsed for _, _, elapsed in rows]),
+            "status_mismatches": sum(
+                1 for entry, status, _ in rows if status != entry["status"]
+            ),
+        }
+
+    endpoints = {}
+    for row in results:
+        endpoints.setdefault(row[0]["endpoint"], []).append(row)
+    return {
+        "requests": len(results),
+        "rps": round(len(results) / wall, 2) if wall else None,
+        "overall": compare(results),
+        "endpoints": {name: compare(rows) for name, rows in sorted(endpoints.items())},
+    }